@@ -0,0 +1,220 @@
+"""Синтетические страницы PEP и «Что нового», повторяющие разметку
+docs.python.org и peps.python.org: шапка, боковая панель, карточка
+и объёмный текст. Это не сохранённые копии настоящих страниц."""
+import random
+
+HEAD = (
+    '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+    '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+    '<title>{title}</title>'
+    '<link rel="stylesheet" href="../_static/style.css" type="text/css">'
+    '<script src="../_static/doctools.js"></script>'
+    '</head><body>'
+)
+NAV = (
+    '<nav><ul>{items}</ul></nav>'
+)
+NAV_ITEM = '<li><a href="../pep-{number:04d}/">PEP {number}</a></li>'
+PARAGRAPH = (
+    '<p>{words} <a class="reference external" href="https://example.org/'
+    '{number}">link {number}</a> <code class="docutils literal notranslate">'
+    '<span class="pre">{code}</span></code> {words}</p>'
+)
+CODE_BLOCK = (
+    '<div class="highlight-python3 notranslate"><div class="highlight"><pre>'
+    '{lines}</pre></div></div>'
+)
+CODE_LINE = (
+    '<span class="k">def</span> <span class="nf">f{number}</span>'
+    '<span class="p">(</span><span class="n">x</span>'
+    '<span class="p">):</span>\n    <span class="k">return</span> '
+    '<span class="n">x</span> <span class="o">+</span> '
+    '<span class="mi">{number}</span>\n'
+)
+SECTION = (
+    '<section id="section-{number}"><h2>Section {number}'
+    '<a class="headerlink" href="#section-{number}">¶</a></h2>'
+    '{body}</section>'
+)
+PEP_CARD = (
+    '<h1 class="page-title">PEP {number} – {title}</h1>'
+    '<dl class="rfc2822 field-list simple">'
+    '<dt class="field-odd">Author<span class="colon">:</span></dt>'
+    '<dd class="field-odd">Guido van Rossum &lt;guido at python.org&gt;</dd>'
+    '<dt class="field-even">Status<span class="colon">:</span></dt>'
+    '<dd class="field-even"><abbr title="{status}">{status}</abbr></dd>'
+    '<dt class="field-odd">Type<span class="colon">:</span></dt>'
+    '<dd class="field-odd"><abbr title="Standards Track">Standards Track'
+    '</abbr></dd>'
+    '<dt class="field-even">Created<span class="colon">:</span></dt>'
+    '<dd class="field-even">05-Jul-2001</dd>'
+    '</dl>'
+)
+WHATS_NEW_CARD = (
+    '<h1>What’s New In Python {version}<a class="headerlink" '
+    'href="#what-s-new-in-python-{slug}">¶</a></h1>'
+    '<dl class="field-list simple">'
+    '<dt class="field-odd">Editor<span class="colon">:</span></dt>'
+    '<dd class="field-odd"><p>Editor of {version}</p>\n</dd>'
+    '</dl>'
+)
+WORDS = (
+    'python', 'interpreter', 'module', 'proposal', 'statement', 'syntax',
+    'object', 'function', 'typing', 'annotation', 'runtime', 'library',
+)
+
+
+def body(rng, sections, paragraphs):
+    return ''.join(
+        SECTION.format(number=section, body=''.join(
+            PARAGRAPH.format(
+                words=' '.join(rng.choice(WORDS) for _ in range(60)),
+                number=section * 100 + paragraph,
+                code=rng.choice(WORDS)
+            )
+            for paragraph in range(paragraphs)
+        ) + CODE_BLOCK.format(lines=''.join(
+            CODE_LINE.format(number=line) for line in range(10)
+        )))
+        for section in range(sections)
+    )
+
+
+def pep_page(number, status='Final', sections=12, paragraphs=6):
+    """Страница PEP размером около 120 КБ."""
+    rng = random.Random(number)
+    title = f'Title of PEP {number}'
+    return (
+        HEAD.format(title=f'PEP {number} – {title}')
+        + NAV.format(items=''.join(
+            NAV_ITEM.format(number=item) for item in range(0, 3200, 25)
+        ))
+        + '<article><section id="pep-content">'
+        + PEP_CARD.format(number=number, title=title, status=status)
+        + body(rng, sections, paragraphs)
+        + '</section></article></body></html>'
+    )
+
+
+def whats_new_page(version, sections=40, paragraphs=8):
+    """Страница «Что нового» размером около 470 КБ."""
+    rng = random.Random(version)
+    slug = version.replace('.', '-')
+    return (
+        HEAD.format(title=f'What’s New In Python {version}')
+        + '<div class="body" role="main">'
+        + f'<section id="what-s-new-in-python-{slug}">'
+        + WHATS_NEW_CARD.format(version=version, slug=slug)
+        + body(rng, sections, paragraphs)
+        + '</section></div></body></html>'
+    )
+
+
+def synthetic_pages():
+    """Синтетический набор страниц для бенчмарков: {имя файла: HTML}."""
+    pages = {
+        f'pep-{number:04d}.html': pep_page(number)
+        for number in (1, 8, 484, 3000)
+    }
+    pages.update({
+        f'whatsnew-{version}.html': whats_new_page(version)
+        for version in ('3.12', '3.11', '2.7')
+    })
+    return pages
+
+
+PEP_ZERO_ROW = (
+    '<tr class="row-odd"><td><abbr title="{type_title}">{pep_type}{status}'
+    '</abbr></td><td><a class="pep reference internal" '
+    'href="pep-{number:04d}/" title="PEP {number}">{number}</a></td>'
+    '<td><a class="pep reference internal" href="pep-{number:04d}/">'
+    'Title of PEP {number}</a></td><td>Guido van Rossum</td></tr>'
+)
+PEP_ZERO_TABLE = (
+    '<section id="numerical-index"><h2>Numerical Index</h2>'
+    '<table class="pep-zero-table docutils align-default">'
+    '<thead><tr class="row-odd"><th>Type</th><th>PEP</th>'
+    '<th>Title</th><th>Authors</th></tr></thead>'
+    '<tbody>{rows}</tbody></table></section>'
+)
+WHATS_NEW_ITEM = (
+    '<li class="toctree-l1"><a class="reference internal" '
+    'href="{version}.html">What’s New In Python {version}</a></li>'
+)
+SIDEBAR_VERSION = (
+    '<li><a href="https://docs.python.org/{version}/">'
+    'Python {version} ({status})</a></li>'
+)
+PEP_STATUSES = (
+    ('A', 'Active'), ('A', 'Accepted'), ('D', 'Deferred'), ('F', 'Final'),
+    ('P', 'Provisional'), ('R', 'Rejected'), ('S', 'Superseded'),
+    ('W', 'Withdrawn'), ('', 'Draft'),
+)
+WHATS_NEW_VERSIONS = (
+    '3.13', '3.12', '3.11', '3.10', '3.9', '3.8', '3.7', '3.6', '3.5',
+    '3.4', '3.3', '3.2', '3.1', '3.0', '2.7', '2.6', '2.5',
+)
+SIDEBAR_VERSIONS = (
+    ('3.14', 'in development'), ('3.13', 'stable'), ('3.12', 'stable'),
+    ('3.11', 'security-fixes'), ('3.10', 'security-fixes'),
+    ('3.9', 'EOL'), ('3.8', 'EOL'), ('3.7', 'EOL'), ('2.7', 'EOL'),
+)
+
+
+def pep_statuses(count):
+    """Номера PEP и пары (буква статуса в таблице, статус на странице)."""
+    rng = random.Random(count)
+    return [
+        (number, rng.choice(PEP_STATUSES))
+        for number in range(1, count + 1)
+    ]
+
+
+def pep_zero_page(peps):
+    """Страница PEP 0 с таблицей для пар (номер, (буква, статус))."""
+    rows = ''.join(
+        PEP_ZERO_ROW.format(
+            type_title='Standards Track', pep_type='S', status=letter,
+            number=number
+        )
+        for number, (letter, _) in peps
+    )
+    return (
+        HEAD.format(title='PEP 0 – Index of Python Enhancement Proposals')
+        + '<article><section id="pep-content">'
+        + PEP_ZERO_TABLE.format(rows=rows)
+        + '</section></article></body></html>'
+    )
+
+
+def whats_new_index_page(versions=WHATS_NEW_VERSIONS):
+    return (
+        HEAD.format(title='What’s New in Python')
+        + '<div class="body" role="main"><section id="what-s-new-in-python">'
+        + '<h1>What’s New in Python</h1>'
+        + '<div class="toctree-wrapper compound"><ul>'
+        + ''.join(
+            WHATS_NEW_ITEM.format(version=version) for version in versions
+        )
+        + '</ul></div></section></div></body></html>'
+    )
+
+
+def main_page(versions=SIDEBAR_VERSIONS):
+    """Главная страница документации с боковой панелью версий."""
+    rng = random.Random('main')
+    return (
+        HEAD.format(title='3.13 Documentation')
+        + '<div class="document"><div class="body" role="main">'
+        + body(rng, 4, 4)
+        + '</div></div><div class="sphinxsidebar" role="navigation">'
+        + '<div class="sphinxsidebarwrapper"><h3>Download</h3><ul>'
+        + '<li><a href="download.html">Download these documents</a></li>'
+        + '</ul><h3>Docs by version</h3><ul>'
+        + ''.join(
+            SIDEBAR_VERSION.format(version=version, status=status)
+            for version, status in versions
+        )
+        + '<li><a href="https://www.python.org/doc/versions/">'
+        + 'All versions</a></li></ul></div></div></body></html>'
+    )
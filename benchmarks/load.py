@@ -0,0 +1,258 @@
+"""Нагрузочный прогон режимов pep и whats-new на синтетическом сайте.
+
+Запуск из корня проекта:
+    python -m benchmarks.load [--sizes N ...] [--workers N ...]
+                              [--modes MODE ...] [--engine ENGINE]
+                              [--latency S] [--jitter S] [--error-rate P]
+                              [--output FILE]
+
+Локальный HTTP-сервер генерирует таблицу PEP 0 и страницы PEP для
+каждого размера из --sizes, а также оглавление и страницы «Что нового».
+Каждый ответ задерживается на latency ± jitter секунд, доля error-rate
+ответов — 503 Service Unavailable. Каждый режим запускается для каждого
+размера и числа потоков в отдельном процессе, чтобы пиковый объём памяти
+процесса относился только к этому запуску. Сервер работает в основном
+процессе и сам может стать узким местом при большом числе потоков."""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import re
+import resource
+import tempfile
+import threading
+import time
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.corpus import (main_page, pep_page, pep_statuses,
+                               pep_zero_page, whats_new_index_page,
+                               whats_new_page)
+from constants import MEMORY_BACKEND, SYNC_ENGINE
+
+MODES = ('pep', 'whats-new')
+PEPS_PATH = '/peps/'
+DOCS_PATH = '/3/'
+WHATS_NEW_PATH = DOCS_PATH + 'whatsnew/'
+PEP_PATH = re.compile(r'^/peps/pep-(?P<number>\d+)/$')
+WHATS_NEW_PAGE_PATH = re.compile(r'^/3/whatsnew/(?P<version>[\d.]+)\.html$')
+ERROR_STATUS = 503
+REQUEST_QUEUE_SIZE = 1024
+
+REPORT_HEADER = (
+    '{:<10} {:>7} {:>7} {:>9} {:>8} {:>8} {:>9} {:>11} {:>10}'
+)
+REPORT_ROW = (
+    '{mode:<10} {size:>7} {workers:>7} {requests:>9} {server_errors:>8} '
+    '{item_errors:>8} {wall_time:>9.2f} {requests_per_second:>11.1f} '
+    '{peak_rss:>10.1f}'
+)
+SITE_MESSAGE = 'Сайт на {} PEP: {}'
+SAVED_MESSAGE = 'Результаты сохранены: {}'
+
+
+class SyntheticSite:
+    """Страницы сайта PEP и документации, создаваемые по запросу.
+    Содержимое страниц зависит только от параметров, задержки и ошибки
+    выбираются генератором случайных чисел с seed."""
+
+    def __init__(
+        self, peps, whats_new=100, sections=2, latency=0.0, jitter=0.0,
+        error_rate=0.0, seed=0
+    ):
+        self.statuses = dict(pep_statuses(peps))
+        self.versions = [f'3.{minor}' for minor in range(whats_new)]
+        self.sections = sections
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.static_pages = {
+            PEPS_PATH: pep_zero_page(self.statuses.items()),
+            DOCS_PATH: main_page(),
+            WHATS_NEW_PATH: whats_new_index_page(self.versions),
+        }
+
+    def page(self, path):
+        """HTML страницы по пути URL или None, если страницы нет."""
+        if path in self.static_pages:
+            return self.static_pages[path]
+        match = PEP_PATH.match(path)
+        if match is not None:
+            number = int(match['number'])
+            if number not in self.statuses:
+                return None
+            return pep_page(
+                number, self.statuses[number][1], sections=self.sections
+            )
+        match = WHATS_NEW_PAGE_PATH.match(path)
+        if match is not None and match['version'] in self.versions:
+            return whats_new_page(match['version'], sections=self.sections)
+        return None
+
+    def delay(self):
+        """Задержка ответа и признак ответа с ошибкой."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(
+                -self.jitter, self.jitter
+            )
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+        return max(0, delay), failed
+
+    @contextlib.contextmanager
+    def serve(self):
+        """Запускает сервер в потоке и возвращает его адрес."""
+        server = SiteServer(('127.0.0.1', 0), make_handler(self))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield 'http://{}:{}'.format(*server.server_address)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+def make_handler(site):
+    class SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            delay, failed = site.delay()
+            time.sleep(delay)
+            page = None if failed else site.page(self.path)
+            status = 200
+            if failed:
+                status = ERROR_STATUS
+            elif page is None:
+                status = 404
+            body = (page or '').encode('utf-8')
+            try:
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except ConnectionError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+def run_load(mode, base_url, engine, workers, rate):
+    """Запуск режима в дочернем процессе. Возвращает длительность,
+    число необработанных страниц и ошибок запросов и пиковый объём
+    памяти процесса в МБ."""
+    import main
+    from configs import configure_session
+    from engines import close_process_pool
+    logging.disable(logging.CRITICAL)
+    main.MAIN_DOC_URL = base_url + DOCS_PATH
+    main.PEPS_URL = base_url + PEPS_PATH
+    cli_args = Namespace(
+        mode=mode, cache_backend=MEMORY_BACKEND, engine=engine,
+        workers=workers, rate=rate
+    )
+    with tempfile.TemporaryDirectory() as base_dir, \
+            open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stderr(devnull):
+        main.BASE_DIR = Path(base_dir)
+        session = configure_session(cli_args)
+        start = time.perf_counter()
+        main.MODE_TO_FUNCTION[mode](session, cli_args)
+        wall_time = time.perf_counter() - start
+        close_process_pool(session)
+        session.cache_index.close()
+        session.extraction_cache.close()
+    return {
+        'wall_time': wall_time,
+        'item_errors': session.run_metrics.item_errors,
+        'request_errors': session.run_metrics.request_errors,
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / 1024,
+    }
+
+
+def run_in_process(site, base_url, mode, engine, workers, rate):
+    """Запускает режим в новом процессе и дополняет его показатели
+    счётчиками сервера."""
+    requests_before, errors_before = site.requests, site.errors
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        result = pool.submit(
+            run_load, mode, base_url, engine, workers, rate
+        ).result()
+    result['requests'] = site.requests - requests_before
+    result['server_errors'] = site.errors - errors_before
+    result['requests_per_second'] = result['requests'] / result['wall_time']
+    return result
+
+
+def main_load():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 50000]
+    )
+    parser.add_argument('--workers', type=int, nargs='+', default=[8, 32])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--engine', default=SYNC_ENGINE)
+    parser.add_argument('--whats-new-pages', type=int, default=100)
+    parser.add_argument('--sections', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path)
+    args = parser.parse_args()
+    runs = []
+    print(REPORT_HEADER.format(
+        'режим', 'PEP', 'потоков', 'запросов', 'ошибок', 'не обраб.',
+        'время, с', 'запросов/с', 'память, МБ'
+    ))
+    for size in args.sizes:
+        site = SyntheticSite(
+            size, args.whats_new_pages, args.sections, args.latency,
+            args.jitter, args.error_rate, args.seed
+        )
+        with site.serve() as base_url:
+            for mode in args.modes:
+                for workers in args.workers:
+                    run = dict(
+                        mode=mode, size=size, workers=workers,
+                        **run_in_process(
+                            site, base_url, mode, args.engine, workers,
+                            args.rate
+                        )
+                    )
+                    runs.append(run)
+                    print(REPORT_ROW.format(**run), flush=True)
+    if args.output is not None:
+        args.output.write_text(json.dumps({
+            'settings': {
+                name: value for name, value in vars(args).items()
+                if name != 'output'
+            },
+            'runs': runs,
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(SAVED_MESSAGE.format(args.output))
+
+
+if __name__ == '__main__':
+    main_load()
@@ -0,0 +1,109 @@
+"""Сравнение полного и частичного разбора страниц PEP и «Что нового».
+
+Запуск из корня проекта:
+    python -m benchmarks.parse_benchmark [--pages DIR] [--repeat N]
+
+В DIR ожидаются сохранённые страницы pep-*.html и whatsnew-*.html.
+Без --pages используются синтетические страницы из benchmarks/corpus.py,
+и отчёт помечается как синтетический."""
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import synthetic_pages
+from extractors import extract_pep_status, extract_whats_new
+from utils import find_next_sibling_tag, find_tag, find_tag_by_text
+
+REPORT_HEADER = '{:<10} {:>8} {:>12} {:>12} {:>14} {:>14}'
+REPORT_ROW = '{:<10} {:>8} {:>12.2f} {:>12.2f} {:>14.0f} {:>14.0f}'
+SYNTHETIC_MESSAGE = (
+    'Страницы синтетические (benchmarks/corpus.py), а не сохранённые '
+    'с сайта; для замеров на настоящих страницах укажите --pages DIR'
+)
+MISMATCH_MESSAGE = (
+    'Полный и частичный разбор страницы {} дают разные данные: {!r} и {!r}'
+)
+
+
+def full_whats_new(content):
+    soup = BeautifulSoup(content.decode('utf-8'), features='lxml')
+    return (
+        find_tag(soup, 'h1').text,
+        find_tag(soup, 'dl').text.replace('\n', ' ')
+    )
+
+
+def full_pep_status(content):
+    soup = BeautifulSoup(content.decode('utf-8'), features='lxml')
+    return find_next_sibling_tag(
+        find_tag_by_text(soup, 'dt', 'Status:'), 'dd'
+    ).text
+
+
+PAGE_KINDS = {
+    'pep': (full_pep_status, extract_pep_status),
+    'whatsnew': (full_whats_new, extract_whats_new),
+}
+
+
+def load_pages(pages_dir):
+    if pages_dir is None:
+        return {
+            name: page.encode('utf-8')
+            for name, page in synthetic_pages().items()
+        }
+    return {path.name: path.read_bytes() for path in pages_dir.glob('*.html')}
+
+
+def measure(parse, contents, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            parse(content)
+        timings.append((time.perf_counter() - start) / len(contents))
+    peak = 0
+    for content in contents:
+        tracemalloc.start()
+        parse(content)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return median(timings) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=Path)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    pages = load_pages(args.pages)
+    if args.pages is None:
+        print(SYNTHETIC_MESSAGE)
+    print(REPORT_HEADER.format(
+        'страницы', 'кол-во', 'было, мс', 'стало, мс', 'было, КБ',
+        'стало, КБ'
+    ))
+    for kind, (before, after) in PAGE_KINDS.items():
+        contents = [
+            content for name, content in pages.items()
+            if name.startswith(kind)
+        ]
+        if not contents:
+            continue
+        expected, got = before(contents[0]), after(contents[0])
+        if expected != got:
+            parser.error(MISMATCH_MESSAGE.format(kind, expected, got))
+        before_time, before_peak = measure(before, contents, args.repeat)
+        after_time, after_peak = measure(after, contents, args.repeat)
+        print(REPORT_ROW.format(
+            kind, len(contents), before_time, after_time, before_peak,
+            after_peak
+        ))
+
+
+if __name__ == '__main__':
+    main()
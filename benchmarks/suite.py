@@ -0,0 +1,357 @@
+"""Бенчмарк режимов парсера и вывода результатов на сохранённых страницах.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite --corpus DIR [--repeat N] [--output FILE]
+                               [--compare FILE] [--threshold T]
+    python -m benchmarks.suite --record DIR
+
+Страницы отдаёт адаптер requests из памяти, сеть не используется.
+В DIR страницы лежат по пути <хост>/<путь URL>, для путей,
+заканчивающихся на /, — в index.html. Такой набор записывает --record
+при запуске режимов на настоящих сайтах. Синтетические страницы
+не замеряются: без --corpus скрипт завершается с ошибкой.
+
+С --compare результаты сравниваются с сохранённым прошлым запуском:
+при ухудшении любого показателя больше чем на порог скрипт
+завершается с кодом 1."""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from argparse import Namespace
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+import main
+import outputs
+from configs import configure_session
+from constants import (EXTRACT_STAGE, FILE_OUTPUT, MEMORY_BACKEND,
+                       PARSE_STAGE, PRETTY_OUTPUT, SYNC_ENGINE)
+from engines import close_process_pool
+
+MODES = ('whats-new', 'latest-versions', 'pep')
+OUTPUTS = (None, PRETTY_OUTPUT, FILE_OUTPUT)
+INDEX_FILE_NAME = 'index.html'
+# Результаты режимов на наборе страниц малы, поэтому вывод замеряется
+# на строках результатов, повторённых до OUTPUT_ROWS.
+OUTPUT_ROWS = 10000
+# Показатели, для которых рост означает ухудшение, и обратные им.
+LOWER_IS_BETTER = ('wall_time', 'parse_time_per_page', 'peak_memory')
+HIGHER_IS_BETTER = ('requests_per_second',)
+
+REPORT_HEADER = '{:<22} {:>10} {:>10} {:>12} {:>14} {:>12}'
+REPORT_ROW = '{:<22} {:>10.3f} {:>10} {:>12.1f} {:>14.3f} {:>12.0f}'
+COMPARE_ROW = '{:<22} {:<20} {:>12.3f} {:>12.3f} {:>+8.1%}{}'
+REGRESSION_MARK = '  <- регрессия'
+CORPUS_MESSAGE = 'Нет папки с набором страниц: {}'
+CORPUS_REQUIRED_MESSAGE = (
+    'Укажите --corpus DIR с набором страниц, записанным --record DIR'
+)
+NOT_FOUND_MESSAGE = 'Страницы нет в наборе: {}'
+RECORDED_MESSAGE = 'Записано страниц: {} в {}'
+SAVED_MESSAGE = 'Результаты сохранены: {}'
+REGRESSIONS_MESSAGE = 'Показателей хуже порога {:.0%}: {}'
+
+
+class CorpusAdapter(HTTPAdapter):
+    """Адаптер requests, отдающий страницы из словаря {URL: байты}.
+    На URL, которого нет в наборе, отвечает 404. Считает запросы."""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.requests += 1
+        content = self.pages.get(request.url)
+        status = 200
+        if content is None:
+            status = 404
+            content = NOT_FOUND_MESSAGE.format(request.url).encode('utf-8')
+        return self.build_response(request, HTTPResponse(
+            body=BytesIO(content),
+            headers={
+                'Content-Type': 'text/html; charset=utf-8',
+                'Content-Length': str(len(content)),
+            },
+            status=status,
+            preload_content=False,
+            request_url=request.url,
+        ))
+
+
+def url_to_path(directory, url):
+    parts = urlsplit(url)
+    path = parts.path.lstrip('/')
+    if not path or path.endswith('/'):
+        path += INDEX_FILE_NAME
+    return directory / parts.netloc / path
+
+
+def load_corpus(directory):
+    """Страницы, сохранённые --record: {URL: байты}."""
+    pages = {}
+    for path in directory.rglob('*'):
+        if not path.is_file():
+            continue
+        host, *parts = path.relative_to(directory).parts
+        if parts[-1] == INDEX_FILE_NAME:
+            parts[-1] = ''
+        pages[f'https://{host}/' + '/'.join(parts)] = path.read_bytes()
+    return pages
+
+
+@contextlib.contextmanager
+def isolated_run(base_dir):
+    """Журналы и файлы результатов пишутся во временную папку,
+    стандартный вывод отбрасывается."""
+    old_dirs = main.BASE_DIR, outputs.BASE_DIR
+    main.BASE_DIR = outputs.BASE_DIR = base_dir
+    try:
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        main.BASE_DIR, outputs.BASE_DIR = old_dirs
+
+
+def make_session(pages, cli_args):
+    session = configure_session(Namespace(
+        cache_backend=MEMORY_BACKEND, profile=True, **vars(cli_args)
+    ))
+    adapter = CorpusAdapter(pages)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session, adapter
+
+
+def close_session(session):
+    close_process_pool(session)
+    session.cache_index.close()
+    session.extraction_cache.close()
+    session.close()
+
+
+def run_mode(pages, mode, cli_args):
+    """Один запуск режима на новой сессии без кеша.
+    Возвращает результаты, длительность, число запросов и среднее
+    время разбора страницы."""
+    session, adapter = make_session(pages, cli_args)
+    try:
+        start = time.perf_counter()
+        results = main.MODE_TO_FUNCTION[mode](session, cli_args)
+        wall_time = time.perf_counter() - start
+        parse_times = [
+            seconds
+            for stage in (PARSE_STAGE, EXTRACT_STAGE)
+            for seconds, _ in session.profiler.timings[stage]
+        ]
+    finally:
+        close_session(session)
+    return (
+        results, wall_time, adapter.requests,
+        sum(parse_times) / len(parse_times) if parse_times else 0
+    )
+
+
+def peak_memory(function, *args):
+    """Пиковый объём памяти, выделенной за вызов, в байтах."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_mode(pages, mode, cli_args, repeat):
+    """Показатели режима по лучшему из repeat запусков:
+    более медленные запуски искажены посторонней нагрузкой."""
+    runs = [run_mode(pages, mode, cli_args) for _ in range(repeat)]
+    results, _, requests_count, _ = runs[-1]
+    wall_time = min(run[1] for run in runs)
+    return results, {
+        'wall_time': wall_time,
+        'requests': requests_count,
+        'requests_per_second': requests_count / wall_time,
+        'parse_time_per_page': min(run[3] for run in runs),
+        'peak_memory': peak_memory(run_mode, pages, mode, cli_args),
+    }
+
+
+def scale_results(results, rows=OUTPUT_ROWS):
+    """Заголовок и строки результатов, повторённые до rows строк."""
+    header, *body = results
+    if not body:
+        return results
+    return [header, *(body[index % len(body)] for index in range(rows))]
+
+
+def bench_output(results, output, mode, repeat):
+    cli_args = Namespace(mode=mode, output=output)
+    results = scale_results(results)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs.control_output(results, cli_args)
+        timings.append(time.perf_counter() - start)
+    return {
+        'wall_time': min(timings),
+        'peak_memory': peak_memory(
+            outputs.control_output, results, cli_args
+        ),
+    }
+
+
+def run_suite(pages, cli_args, repeat):
+    """Показатели каждого режима и каждого вывода его результатов."""
+    benchmarks = {}
+    with tempfile.TemporaryDirectory() as base_dir, \
+            isolated_run(Path(base_dir)):
+        for mode in MODES:
+            results, benchmarks[mode] = bench_mode(
+                pages, mode, cli_args, repeat
+            )
+            for output in OUTPUTS:
+                benchmarks[f'{mode}:{output or "print"}'] = bench_output(
+                    results, output, mode, repeat
+                )
+    return benchmarks
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, benchmarks, threshold):
+    """Печатает изменение показателей относительно baseline
+    и возвращает список ухудшившихся больше чем на threshold."""
+    regressions = []
+    for name, metrics in benchmarks.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old or metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+                continue
+            change = value / old - 1
+            worse = change if metric in LOWER_IS_BETTER else -change
+            regressed = worse > threshold
+            if regressed:
+                regressions.append((name, metric))
+            print(COMPARE_ROW.format(
+                name, metric, old, value, change,
+                REGRESSION_MARK if regressed else ''
+            ))
+    return regressions
+
+
+def print_report(benchmarks):
+    print(REPORT_HEADER.format(
+        'замер', 'время, с', 'запросов', 'запросов/с', 'разбор, мс',
+        'память, КБ'
+    ))
+    for name, metrics in benchmarks.items():
+        print(REPORT_ROW.format(
+            name,
+            metrics['wall_time'],
+            metrics.get('requests', '-'),
+            metrics.get('requests_per_second', 0),
+            metrics.get('parse_time_per_page', 0) * 1000,
+            metrics['peak_memory'] / 1024
+        ))
+
+
+def record_corpus(directory, cli_args):
+    """Запускает режимы на настоящих сайтах и сохраняет каждую
+    полученную страницу в directory."""
+    recorded = []
+
+    def save(response, *args, **kwargs):
+        if response.ok:
+            path = url_to_path(directory, response.url)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(response.content)
+            recorded.append(path)
+
+    session = configure_session(Namespace(
+        cache_backend=MEMORY_BACKEND, **vars(cli_args)
+    ))
+    session.hooks['response'].append(save)
+    try:
+        with tempfile.TemporaryDirectory() as base_dir, \
+                isolated_run(Path(base_dir)):
+            for mode in MODES:
+                main.MODE_TO_FUNCTION[mode](session, cli_args)
+    finally:
+        close_session(session)
+    print(RECORDED_MESSAGE.format(len(recorded), directory))
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', type=Path)
+    parser.add_argument('--record', type=Path)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--engine', default=SYNC_ENGINE)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+    if args.record is None and args.corpus is None:
+        parser.error(CORPUS_REQUIRED_MESSAGE)
+    if args.corpus is not None and not args.corpus.is_dir():
+        parser.error(CORPUS_MESSAGE.format(args.corpus))
+    cli_args = Namespace(engine=args.engine, workers=args.workers)
+    if args.record is not None:
+        record_corpus(args.record, cli_args)
+        return
+    benchmarks = run_suite(load_corpus(args.corpus), cli_args, args.repeat)
+    print_report(benchmarks)
+    if args.output is not None:
+        args.output.write_text(json.dumps({
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'corpus': str(args.corpus),
+            'engine': args.engine,
+            'workers': args.workers,
+            'repeat': args.repeat,
+            'benchmarks': benchmarks,
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(SAVED_MESSAGE.format(args.output))
+    if args.compare is not None:
+        regressions = compare(
+            json.loads(args.compare.read_text(encoding='utf-8'))[
+                'benchmarks'
+            ],
+            benchmarks,
+            args.threshold
+        )
+        if regressions:
+            print(REGRESSIONS_MESSAGE.format(
+                args.threshold, len(regressions)
+            ))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from requests_cache.backends.filesystem import FileDict
+from requests_cache.backends.sqlite import SQLiteDict
+from requests_cache.serializers import CattrStage, SerializerPipeline, Stage
+
+from constants import (EXTRACTION_BATCH_SIZE, FILESYSTEM_BACKEND,
+                       MEMORY_BACKEND, SQLITE_BACKEND)
+
+CREATE_INDEX_SQL = (
+    'CREATE TABLE IF NOT EXISTS cache_index '
+    '(key TEXT PRIMARY KEY, accessed REAL NOT NULL)'
+)
+CREATE_EXTRACTIONS_SQL = (
+    'CREATE TABLE IF NOT EXISTS extractions '
+    '(url TEXT NOT NULL, extractor TEXT NOT NULL, digest TEXT NOT NULL, '
+    'version INTEGER NOT NULL, record TEXT NOT NULL, '
+    'PRIMARY KEY (url, extractor))'
+)
+
+
+def decompress(data):
+    """Распаковка тела записи. Ошибка zlib превращается в ValueError,
+    чтобы requests-cache считал запись старого формата отсутствующей."""
+    try:
+        return zlib.decompress(data)
+    except zlib.error as error:
+        raise ValueError(error) from error
+
+
+COMPRESSED_SERIALIZER = SerializerPipeline(
+    [
+        CattrStage(),
+        Stage(pickle),
+        Stage(dumps=zlib.compress, loads=decompress),
+    ],
+    name='pickle_zlib',
+    is_binary=True,
+)
+BACKEND_OPTIONS = {
+    SQLITE_BACKEND: {
+        'backend': 'sqlite', 'wal': True, 'serializer': COMPRESSED_SERIALIZER
+    },
+    FILESYSTEM_BACKEND: {
+        'backend': 'filesystem', 'serializer': COMPRESSED_SERIALIZER
+    },
+    MEMORY_BACKEND: {'backend': 'memory'},
+}
+
+
+def stored_sizes(responses):
+    """Размер каждой записи хранилища кеша в байтах так, как она
+    хранится: после сериализации pickle и сжатия zlib. Кеш в памяти
+    хранит ответы без сериализации, для него берётся размер тела."""
+    if isinstance(responses, SQLiteDict):
+        with responses.connection() as connection:
+            return dict(connection.execute(
+                f'SELECT key, length(value) FROM {responses.table_name}'
+            ))
+    if isinstance(responses, FileDict):
+        return {path.stem: path.stat().st_size for path in responses.paths()}
+    return {key: len(response.content) for key, response in responses.items()}
+
+
+class CacheIndex:
+    """Время последнего обращения к каждой записи кеша.
+    Обращения копятся в памяти и записываются в базу одним пакетом."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(CREATE_INDEX_SQL)
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def touch(self, key):
+        with self.lock:
+            self.pending[key] = time.time()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO cache_index VALUES (?, ?)',
+                    pending.items()
+                )
+
+    def evict(self, cache, max_size):
+        """Удаляет из кеша давно не запрошенные записи, пока суммарный
+        размер записей в хранилище больше max_size байт. Записи без
+        обращений в индексе удаляются первыми. Возвращает число
+        удалённых записей."""
+        self.flush()
+        sizes = stored_sizes(cache.responses)
+        keys = [
+            key for key, in self.connection.execute(
+                'SELECT key FROM cache_index ORDER BY accessed DESC'
+            )
+        ]
+        stale_keys = [key for key in keys if key not in sizes]
+        indexed_keys = set(keys)
+        keys.extend(key for key in sizes if key not in indexed_keys)
+        total_size = 0
+        evicted_keys = []
+        for key in keys:
+            if key not in sizes:
+                continue
+            total_size += sizes[key]
+            if total_size > max_size:
+                evicted_keys.append(key)
+        if evicted_keys:
+            cache.delete(*evicted_keys)
+            if hasattr(cache.responses, 'vacuum'):
+                cache.responses.vacuum()
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM cache_index WHERE key = ?',
+                [(key,) for key in stale_keys + evicted_keys]
+            )
+        return len(evicted_keys)
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            with self.connection:
+                self.connection.execute('DELETE FROM cache_index')
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+class ExtractionCache:
+    """Данные, извлечённые из страниц, по URL и sha256 тела ответа.
+    Пока тело страницы не изменилось, повторный разбор не нужен.
+    Новые записи записываются в базу пакетами по EXTRACTION_BATCH_SIZE,
+    чтобы прерванный запуск не терял всё извлечённое.
+    Записи другой версии извлечения удаляются при открытии."""
+
+    def __init__(self, path, version):
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.version = version
+        with self.connection:
+            self.connection.execute(CREATE_EXTRACTIONS_SQL)
+            self.connection.execute(
+                'DELETE FROM extractions WHERE version != ?', (version,)
+            )
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(url, content, extract):
+        return url, extract.__name__, hashlib.sha256(content).hexdigest()
+
+    def get(self, key):
+        """Извлечённые данные или None, если страница ещё не разбиралась."""
+        with self.lock:
+            record = self.pending.get(key)
+            if record is None:
+                row = self.connection.execute(
+                    'SELECT record FROM extractions '
+                    'WHERE url = ? AND extractor = ? AND digest = ?',
+                    key
+                ).fetchone()
+                record = None if row is None else json.loads(row[0])
+            if record is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return tuple(record) if isinstance(record, list) else record
+
+    def set(self, key, record):
+        with self.lock:
+            self.pending[key] = record
+            if len(self.pending) >= EXTRACTION_BATCH_SIZE:
+                self.write_pending()
+
+    def extract(self, url, content, extract):
+        """Возвращает данные из кеша или извлекает их и сохраняет."""
+        key = self.make_key(url, content, extract)
+        record = self.get(key)
+        if record is None:
+            record = extract(content)
+            self.set(key, record)
+        return record
+
+    def write_pending(self):
+        pending, self.pending = self.pending, {}
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)',
+                [
+                    (*key, self.version, json.dumps(record))
+                    for key, record in pending.items()
+                ]
+            )
+
+    def flush(self):
+        with self.lock:
+            self.write_pending()
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            with self.connection:
+                self.connection.execute('DELETE FROM extractions')
+
+    def close(self):
+        self.flush()
+        self.connection.close()
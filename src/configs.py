@@ -1,8 +1,26 @@
 import argparse
+import json
 import logging
+import threading
 from logging.handlers import RotatingFileHandler
 
-from constants import FILE_OUTPUT, LOG_DIR, LOG_FILE, PRETTY_OUTPUT
+import requests_cache
+
+from cache import BACKEND_OPTIONS, CacheIndex, ExtractionCache
+from constants import (ALL_FORMATS, ASYNC_ENGINE, CACHE_INDEX_NAME,
+                       CACHE_NAME, DEFAULT_DOWNLOAD_FORMATS,
+                       DEFAULT_EXPIRE_AFTER, DEFAULT_RETRIES, DEFAULT_SEGMENTS,
+                       DEFAULT_WORKERS, DOWNLOAD_FORMATS,
+                       EXTRACTION_CACHE_NAME, FILE_OUTPUT, FILESYSTEM_BACKEND,
+                       HTML_SOURCE, JSON_SOURCE, JSONL_OUTPUT, LOG_DIR,
+                       LOG_FILE, MEMORY_BACKEND, PRETTY_OUTPUT,
+                       PROCESS_ENGINE, SQLITE_BACKEND, SQLITE_OUTPUT,
+                       SYNC_ENGINE, URLS_EXPIRE_AFTER)
+from extractors import EXTRACTION_VERSION
+from metrics import RunMetrics
+from profiling import Profiler
+from transport import configure_transport
+from utils import CacheStats
 
 LOG_FORMAT = '%(asctime)s - [%(levelname)s] - %(message)s'
 DT_FORMAT = '%d.%m.%Y %H:%M:%S'
@@ -10,12 +28,98 @@ DESCRIPTION = 'Парсер документации Python'
 MODE_HELP = 'Режимы работы парсера'
 CLEAR_CACHE_HELP = 'Очистка кеша'
 OUTPUT_HELP = 'Дополнительные способы вывода данных'
+WORKERS_HELP = 'Количество потоков для загрузки страниц'
+ENGINE_HELP = 'Движок загрузки страниц'
+TIMEOUT_HELP = (
+    'Время ожидания ответа на один запрос, с; без опции действуют '
+    'таймауты подключения и чтения транспорта'
+)
+PROCESSES_HELP = (
+    'Количество процессов для разбора страниц в движке process '
+    '(по умолчанию — число ядер)'
+)
+PEP_SOURCE_HELP = 'Источник статусов на страницах PEP'
+FORMATS_HELP = 'Форматы архивов с документацией для загрузки'
+SEGMENTS_HELP = 'Количество параллельных частей при загрузке большого архива'
+LIMIT_RATE_HELP = 'Ограничение суммарной скорости загрузки, байт/с'
+EXPIRE_CONFIG_HELP = (
+    'JSON-файл со сроками хранения страниц в кеше: '
+    '{"шаблон URL": секунды}, -1 — хранить бессрочно'
+)
+CACHE_BACKEND_HELP = 'Хранилище кеша'
+CACHE_MAX_SIZE_HELP = (
+    'Максимальный объём страниц в кеше, МБ. Сверх него удаляются '
+    'страницы, которые дольше всего не запрашивались'
+)
+INCREMENTAL_HELP = (
+    'Загружать в режиме pep только новые, изменившиеся и устаревшие PEP, '
+    'остальные статусы брать из снимка прошлого запуска'
+)
+RESUME_HELP = (
+    'Продолжить прерванный обход в режимах whats-new и pep: '
+    'страницы из журнала прошлого запуска не загружаются'
+)
+RETRIES_HELP = (
+    'Количество повторов для страниц, которые не удалось загрузить '
+    'или разобрать; пауза перед каждым повтором удваивается'
+)
+TRANSPORT_CONFIG_HELP = (
+    'JSON-файл с настройками соединений: pool_size, keep_alive, '
+    'connect_timeout, read_timeout, http_retries, backoff_factor, '
+    'rate, min_rate, max_rate, target_latency, hedge'
+)
+POOL_SIZE_HELP = (
+    'Размер пула соединений на хост (по умолчанию не меньше --workers)'
+)
+CONNECT_TIMEOUT_HELP = 'Время ожидания подключения, с'
+READ_TIMEOUT_HELP = 'Время ожидания данных от сервера, с'
+HTTP_RETRIES_HELP = 'Количество повторов запроса при ответах 429 и 5xx'
+BACKOFF_FACTOR_HELP = 'Множитель экспоненциальной паузы между повторами, с'
+RATE_HELP = (
+    'Начальная частота запросов к одному хосту, запросов/с; '
+    'подстраивается под ответы сервера, 0 — без ограничения'
+)
+MAX_RATE_HELP = 'Максимальная частота запросов к одному хосту, запросов/с'
+HEDGE_HELP = (
+    'Дублировать запрос, если ответ не пришёл за p95 времени ответа, '
+    'и использовать первый пришедший ответ'
+)
+NO_KEEP_ALIVE_HELP = 'Закрывать соединение после каждого запроса'
+PROFILE_HELP = (
+    'Замерить этапы работы (загрузка, кеш, разбор, извлечение, вывод) '
+    'и вывести отчёт с p50/p95/max по этапам и самыми долгими URL'
+)
+PROFILE_DUMP_HELP = 'Сохранить статистику cProfile в файл (pstats)'
+HISTORY_HELP = (
+    'Сохранить записи запуска в историю запусков для сравнения '
+    'командой python history.py'
+)
+HISTORY_DESCRIPTION = 'История запусков парсера'
+HISTORY_COMMAND_HELP = (
+    'runs — запуски режима, diff — изменения между двумя запусками, '
+    'history — значения одной записи по запускам'
+)
+HISTORY_MODE_HELP = 'Режим парсера'
+HISTORY_OLD_HELP = (
+    'Прежний запуск для diff: номер или дата и время ISO '
+    '(последний запуск не позже неё), по умолчанию предпоследний'
+)
+HISTORY_NEW_HELP = (
+    'Новый запуск для diff: номер или дата и время ISO, '
+    'по умолчанию последний'
+)
+HISTORY_KEY_HELP = 'Ключ записи для history: ссылка на статью, версию или PEP'
+METRICS_HELP = (
+    'Сохранить метрики запуска в файл: .prom — для textfile collector '
+    'Prometheus, иначе JSON'
+)
 
 
 def configure_argument_parser(available_models):
     parser = argparse.ArgumentParser(description=DESCRIPTION)
     parser.add_argument(
         'mode',
+        nargs='+',
         choices=available_models,
         help=MODE_HELP
         )
@@ -28,7 +132,188 @@ def configure_argument_parser(available_models):
     parser.add_argument(
         '-o',
         '--output',
-        choices=(PRETTY_OUTPUT, FILE_OUTPUT), help=OUTPUT_HELP
+        choices=(PRETTY_OUTPUT, FILE_OUTPUT, JSONL_OUTPUT, SQLITE_OUTPUT),
+        help=OUTPUT_HELP
+        )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=WORKERS_HELP
+        )
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=(SYNC_ENGINE, ASYNC_ENGINE, PROCESS_ENGINE),
+        default=SYNC_ENGINE,
+        help=ENGINE_HELP
+        )
+    parser.add_argument(
+        '-t',
+        '--timeout',
+        type=float,
+        help=TIMEOUT_HELP
+        )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        help=PROCESSES_HELP
+        )
+    parser.add_argument(
+        '-s',
+        '--pep-source',
+        choices=(HTML_SOURCE, JSON_SOURCE),
+        default=HTML_SOURCE,
+        help=PEP_SOURCE_HELP
+        )
+    parser.add_argument(
+        '--formats',
+        nargs='+',
+        choices=(*DOWNLOAD_FORMATS, ALL_FORMATS),
+        default=DEFAULT_DOWNLOAD_FORMATS,
+        help=FORMATS_HELP
+        )
+    parser.add_argument(
+        '--segments',
+        type=int,
+        default=DEFAULT_SEGMENTS,
+        help=SEGMENTS_HELP
+        )
+    parser.add_argument(
+        '--limit-rate',
+        type=int,
+        help=LIMIT_RATE_HELP
+        )
+    parser.add_argument(
+        '--expire-config',
+        help=EXPIRE_CONFIG_HELP
+        )
+    parser.add_argument(
+        '--cache-backend',
+        choices=(SQLITE_BACKEND, FILESYSTEM_BACKEND, MEMORY_BACKEND),
+        default=SQLITE_BACKEND,
+        help=CACHE_BACKEND_HELP
+        )
+    parser.add_argument(
+        '--cache-max-size',
+        type=float,
+        help=CACHE_MAX_SIZE_HELP
+        )
+    parser.add_argument(
+        '-i',
+        '--incremental',
+        action='store_true',
+        help=INCREMENTAL_HELP
+        )
+    parser.add_argument(
+        '-r',
+        '--resume',
+        action='store_true',
+        help=RESUME_HELP
+        )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=RETRIES_HELP
+        )
+    parser.add_argument(
+        '--transport-config',
+        help=TRANSPORT_CONFIG_HELP
+        )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        help=POOL_SIZE_HELP
+        )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        help=CONNECT_TIMEOUT_HELP
+        )
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        help=READ_TIMEOUT_HELP
+        )
+    parser.add_argument(
+        '--http-retries',
+        type=int,
+        help=HTTP_RETRIES_HELP
+        )
+    parser.add_argument(
+        '--backoff-factor',
+        type=float,
+        help=BACKOFF_FACTOR_HELP
+        )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        help=RATE_HELP
+        )
+    parser.add_argument(
+        '--max-rate',
+        type=float,
+        help=MAX_RATE_HELP
+        )
+    parser.add_argument(
+        '--hedge',
+        action='store_const',
+        const=True,
+        help=HEDGE_HELP
+        )
+    parser.add_argument(
+        '--no-keep-alive',
+        action='store_const',
+        const=False,
+        dest='keep_alive',
+        help=NO_KEEP_ALIVE_HELP
+        )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=PROFILE_HELP
+        )
+    parser.add_argument(
+        '--profile-dump',
+        help=PROFILE_DUMP_HELP
+        )
+    parser.add_argument(
+        '--metrics',
+        help=METRICS_HELP
+        )
+    parser.add_argument(
+        '--history',
+        action='store_true',
+        help=HISTORY_HELP
+        )
+    return parser
+
+
+def configure_history_parser(available_commands):
+    parser = argparse.ArgumentParser(description=HISTORY_DESCRIPTION)
+    parser.add_argument(
+        'command',
+        choices=available_commands,
+        help=HISTORY_COMMAND_HELP
+        )
+    parser.add_argument(
+        'mode',
+        help=HISTORY_MODE_HELP
+        )
+    parser.add_argument(
+        '--old',
+        help=HISTORY_OLD_HELP
+        )
+    parser.add_argument(
+        '--new',
+        help=HISTORY_NEW_HELP
+        )
+    parser.add_argument(
+        '--key',
+        help=HISTORY_KEY_HELP
         )
     return parser
 
@@ -45,3 +330,56 @@ def configure_logging():
         handlers=(rotating_handler, logging.StreamHandler()),
         encoding='utf-8'
     )
+
+
+def load_expire_rules(path=None):
+    """Сроки хранения страниц в кеше по шаблонам URL.
+    Правила из файла проверяются раньше правил по умолчанию."""
+    rules = {}
+    if path is not None:
+        with open(path, encoding='utf-8') as file:
+            rules.update(json.load(file))
+    for pattern, expire_after in URLS_EXPIRE_AFTER.items():
+        rules.setdefault(pattern, expire_after)
+    return rules
+
+
+def configure_session(cli_args):
+    """Сессия с кешем в выбранном хранилище, сроками хранения по шаблонам
+    URL и подсчётом ответов из кеша. Устаревшие страницы с ETag или
+    Last-Modified перепроверяются условным запросом. Данные, извлечённые
+    из страниц, хранятся во втором кеше по хешу тела страницы.
+    Пул соединений и повторы настраиваются адаптером транспорта."""
+    backend = getattr(cli_args, 'cache_backend', SQLITE_BACKEND)
+    session = requests_cache.CachedSession(
+        CACHE_NAME,
+        expire_after=DEFAULT_EXPIRE_AFTER,
+        urls_expire_after=load_expire_rules(
+            getattr(cli_args, 'expire_config', None)
+        ),
+        **BACKEND_OPTIONS[backend]
+    )
+    configure_transport(session, cli_args)
+    in_memory = backend == MEMORY_BACKEND
+    session.cache_index = CacheIndex(
+        ':memory:' if in_memory else CACHE_INDEX_NAME
+    )
+    session.extraction_cache = ExtractionCache(
+        ':memory:' if in_memory else EXTRACTION_CACHE_NAME,
+        EXTRACTION_VERSION
+    )
+    if getattr(cli_args, 'clear_cache', False):
+        session.cache.clear()
+        session.cache_index.clear()
+        session.extraction_cache.clear()
+    session.cache_stats = CacheStats()
+    session.run_history = threading.local()
+    session.process_pool = None
+    session.run_metrics = RunMetrics()
+    profile_dump = getattr(cli_args, 'profile_dump', None)
+    session.profiler = (
+        Profiler(profile_dump)
+        if getattr(cli_args, 'profile', False) or profile_dump
+        or getattr(cli_args, 'metrics', None) else None
+    )
+    return session
@@ -2,12 +2,101 @@ from pathlib import Path
 
 MAIN_DOC_URL = 'https://docs.python.org/3/'
 PEPS_URL = 'https://peps.python.org/'
+PEPS_JSON_PATH = 'api/peps.json'
+PEP_PAGE_PATH = 'pep-{:04d}/'
 
 BASE_DIR = Path(__file__).parent
 LOG_DIR = BASE_DIR / 'logs'
 LOG_FILE = LOG_DIR / 'parser.log'
 RESULTS_DIR_NAME = 'results'
 DOWNLOADS_DIR_NAME = 'downloads'
+JOURNALS_DIR_NAME = 'journals'
+JOURNAL_FILE_NAME = '{}.jsonl'
+DOWNLOAD_CHUNK_SIZE = 2**16
+PART_FILE_SUFFIX = '.part'
+VALIDATOR_FILE_SUFFIX = '.validator'
+MANIFEST_FILE_NAME = 'manifest.json'
+SEGMENT_MIN_SIZE = 2**23
+DEFAULT_SEGMENTS = 1
+DOWNLOAD_FORMATS = (
+    'pdf-a4.zip',
+    'pdf-a4.tar.bz2',
+    'pdf-letter.zip',
+    'pdf-letter.tar.bz2',
+    'html.zip',
+    'html.tar.bz2',
+    'text.zip',
+    'text.tar.bz2',
+    'epub',
+)
+DEFAULT_DOWNLOAD_FORMATS = ('pdf-a4.zip',)
+ALL_FORMATS = 'all'
+
+DEFAULT_WORKERS = 1
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 0.5
+TRANSPORT_SETTINGS = {
+    'pool_size': 10,
+    'keep_alive': True,
+    'connect_timeout': 5,
+    'read_timeout': DEFAULT_TIMEOUT,
+    'http_retries': 3,
+    'backoff_factor': 0.5,
+    'rate': 5,
+    'min_rate': 0.5,
+    'max_rate': 50,
+    'target_latency': 2,
+    'hedge': False,
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = ('GET', 'HEAD')
+THROTTLE_STATUSES = frozenset((429, 503))
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+SYNC_ENGINE = 'sync'
+ASYNC_ENGINE = 'async'
+PROCESS_ENGINE = 'process'
+HTML_SOURCE = 'html'
+JSON_SOURCE = 'json'
+ALL_MODES = 'all'
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+NEVER_EXPIRE = -1
+DEFAULT_EXPIRE_AFTER = DAY
+URLS_EXPIRE_AFTER = {
+    'peps.python.org/api/': HOUR,
+    'peps.python.org/pep-': DAY,
+    'peps.python.org/': HOUR,
+    'docs.python.org/3/whatsnew/2.': 30 * DAY,
+    'docs.python.org/3/whatsnew/3.?.html': 30 * DAY,
+    'docs.python.org/3/whatsnew/': DAY,
+}
+FINAL_PEP_EXPIRE_AFTER = 30 * DAY
+FINAL_TABLE_STATUS = 'F'
+SNAPSHOT_FILE_NAME = 'pep_snapshot.json'
+SNAPSHOT_EXPIRE_AFTER = DAY
+CACHE_NAME = 'http_cache'
+CACHE_INDEX_NAME = 'http_cache_index.sqlite'
+EXTRACTION_CACHE_NAME = 'extraction_cache.sqlite'
+EXTRACTION_BATCH_SIZE = 100
+SQLITE_BACKEND = 'sqlite'
+FILESYSTEM_BACKEND = 'filesystem'
+MEMORY_BACKEND = 'memory'
+CACHE_FRESH = 'fresh'
+CACHE_REVALIDATED = 'revalidated'
+CACHE_REFETCHED = 'refetched'
+
+PROFILE_SLOWEST = 10
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FETCH_STAGE = 'fetch'
+CACHE_STAGE = 'cache'
+PARSE_STAGE = 'parse'
+EXTRACT_STAGE = 'extract'
+MODE_STAGE = 'mode'
+OUTPUT_STAGE = 'output'
 
 DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 EXPECTED_STATUS = {
@@ -22,3 +111,9 @@ EXPECTED_STATUS = {
 }
 PRETTY_OUTPUT = 'pretty'
 FILE_OUTPUT = 'file'
+JSONL_OUTPUT = 'jsonl'
+SQLITE_OUTPUT = 'sqlite'
+RESULTS_DB_NAME = 'results.sqlite'
+HISTORY_DB_NAME = 'history.sqlite'
+OUTPUT_BATCH_SIZE = 1000
+SQLITE_TIMEOUT = 60
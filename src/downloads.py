@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from tqdm import tqdm
+
+from constants import (DOWNLOAD_CHUNK_SIZE, MANIFEST_FILE_NAME,
+                       PART_FILE_SUFFIX, SEGMENT_MIN_SIZE,
+                       VALIDATOR_FILE_SUFFIX)
+from exceptions import ParserDownloadException
+from utils import get_response
+
+CONTENT_RANGE_MESSAGE = 'Сервер вернул диапазон {} вместо bytes {}- для {}'
+SIZE_MESSAGE = 'Загружено {} байт из {} для {}'
+DOWNLOAD_TQDM_MESSAGE = 'Загрузка архивов'
+
+MANIFEST_LOCK = threading.Lock()
+# Счётчики запуска, которые get_response ведёт в сессии.
+SESSION_COUNTERS = ('profiler', 'run_metrics', 'cache_stats')
+
+
+class TransferMonitor:
+    """Общий прогресс-бар и ограничение скорости для параллельных загрузок.
+    rate_limit — суммарная скорость всех загрузок, байт в секунду."""
+
+    def __init__(self, rate_limit=None):
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+        self.bar = tqdm(
+            total=0,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=DOWNLOAD_TQDM_MESSAGE
+        )
+
+    def expect(self, size):
+        """Увеличивает общий объём загрузки."""
+        with self.lock:
+            self.bar.total += size
+            self.bar.refresh()
+
+    def transferred(self, size):
+        """Учитывает загруженные байты, при необходимости выжидая,
+        чтобы не превысить ограничение скорости."""
+        if self.rate_limit:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_time)
+                self.next_time = start + size / self.rate_limit
+            time.sleep(max(0, start - now))
+        self.bar.update(size)
+
+    def close(self):
+        self.bar.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def transfer_session(session):
+    """Сессия без кеша для загрузки архивов с адаптерами session: общими
+    пулом соединений, повторами и ограничением частоты запросов, — и её
+    заголовками и счётчиками. Кеш session не отключается и во время
+    загрузки остаётся доступен другим потокам. Сессию без кеша функция
+    возвращает как есть. Закрывать новую сессию нельзя: это закроет
+    общие адаптеры."""
+    if getattr(session, 'cache', None) is None:
+        return session
+    transfer = requests.Session()
+    transfer.headers = session.headers
+    for prefix, adapter in session.adapters.items():
+        transfer.mount(prefix, adapter)
+    for name in SESSION_COUNTERS:
+        setattr(transfer, name, getattr(session, name, None))
+    return transfer
+
+
+def hash_file(path, checksum, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Добавляет содержимое файла в объект хеша."""
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            checksum.update(chunk)
+    return checksum
+
+
+def make_record(url, headers, size, checksum):
+    """Запись о загрузке для манифеста."""
+    return {
+        'url': url,
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'size': size,
+        'sha256': checksum.hexdigest(),
+    }
+
+
+def make_validator(headers):
+    """Валидатор ответа для If-Range: сильный ETag или Last-Modified.
+    Слабый ETag в If-Range не допускается."""
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def read_validator(path):
+    try:
+        return path.read_text(encoding='utf-8') or None
+    except FileNotFoundError:
+        return None
+
+
+def save_validator(path, validator):
+    if validator is None:
+        path.unlink(missing_ok=True)
+    else:
+        path.write_text(validator, encoding='utf-8')
+
+
+def download_file(
+    session, url, path, headers=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+    monitor=None, **kwargs
+):
+    """Потоковая загрузка файла сессией без кеша с докачкой.
+    Данные пишутся во временный файл <path>.part, который после
+    загрузки атомарно переименовывается в path. Рядом с ним хранится
+    валидатор ответа: докачка запрашивается с If-Range, и если файл
+    на сервере изменился, он приходит целиком ответом 200 и .part
+    записывается заново. Без валидатора файл загружается с начала.
+    Возвращает запись для манифеста с sha256 файла, посчитанным
+    во время загрузки, или None, если сервер ответил 304 Not Modified."""
+    session = transfer_session(session)
+    part_path = path.with_name(path.name + PART_FILE_SUFFIX)
+    validator_path = part_path.with_name(
+        part_path.name + VALIDATOR_FILE_SUFFIX
+    )
+    checksum = hashlib.sha256()
+    validator = read_validator(validator_path)
+    offset = (
+        part_path.stat().st_size
+        if validator is not None and part_path.exists() else 0
+    )
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers['Range'] = f'bytes={offset}-'
+        request_headers['If-Range'] = validator
+    response = get_response(
+        session, url, headers=request_headers, stream=True, **kwargs
+    )
+    with response:
+        if response.status_code == 304:
+            response.close()
+            return None
+        if response.status_code == 416:
+            response.close()
+            part_path.unlink()
+            validator_path.unlink(missing_ok=True)
+            return download_file(
+                session, url, path, headers, chunk_size, monitor, **kwargs
+            )
+        response.raise_for_status()
+        if response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            if not content_range.startswith(f'bytes {offset}-'):
+                raise ParserDownloadException(
+                    CONTENT_RANGE_MESSAGE.format(content_range, offset, url)
+                )
+            hash_file(part_path, checksum, chunk_size)
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+            save_validator(validator_path, make_validator(response.headers))
+        expected_size = (
+            offset + int(response.headers['Content-Length'])
+            if 'Content-Length' in response.headers
+            and 'Content-Encoding' not in response.headers else None
+        )
+        if monitor is not None and expected_size is not None:
+            monitor.expect(expected_size - offset)
+        with open(part_path, mode) as file:
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+                checksum.update(chunk)
+                if monitor is not None:
+                    monitor.transferred(len(chunk))
+            file.flush()
+            os.fsync(file.fileno())
+    size = part_path.stat().st_size
+    if expected_size is not None and size != expected_size:
+        raise ParserDownloadException(
+            SIZE_MESSAGE.format(size, expected_size, url)
+        )
+    os.replace(part_path, path)
+    validator_path.unlink(missing_ok=True)
+    return make_record(url, response.headers, size, checksum)
+
+
+def download_segment(
+    session, url, part_path, start, end, chunk_size=DOWNLOAD_CHUNK_SIZE,
+    monitor=None, validator=None, **kwargs
+):
+    """Загружает диапазон байт start-end в уже созданный файл.
+    С validator диапазон запрашивается с If-Range, и части файла,
+    изменившегося на сервере во время загрузки, не смешиваются."""
+    headers = {'Range': f'bytes={start}-{end}'}
+    if validator is not None:
+        headers['If-Range'] = validator
+    response = get_response(
+        session, url, headers=headers, stream=True, **kwargs
+    )
+    response.raise_for_status()
+    content_range = response.headers.get('Content-Range', '')
+    if (
+        response.status_code != 206
+        or not content_range.startswith(f'bytes {start}-{end}/')
+    ):
+        response.close()
+        raise ParserDownloadException(
+            CONTENT_RANGE_MESSAGE.format(content_range, start, url)
+        )
+    with open(part_path, 'r+b') as file:
+        file.seek(start)
+        for chunk in response.iter_content(chunk_size):
+            file.write(chunk)
+            if monitor is not None:
+                monitor.transferred(len(chunk))
+        written = file.tell() - start
+        file.flush()
+        os.fsync(file.fileno())
+    if written != end - start + 1:
+        raise ParserDownloadException(
+            SIZE_MESSAGE.format(written, end - start + 1, url)
+        )
+
+
+def download_segmented(
+    session, url, path, size, headers, segments, monitor=None, **kwargs
+):
+    """Загрузка файла параллельными диапазонами байт.
+    Части приходят не по порядку, поэтому sha256 считается
+    одним чтением готового файла."""
+    part_path = path.with_name(path.name + PART_FILE_SUFFIX)
+    with open(part_path, 'wb') as file:
+        file.truncate(size)
+    if monitor is not None:
+        monitor.expect(size)
+    session = transfer_session(session)
+    step = -(-size // segments)
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(
+                download_segment, session, url, part_path, start,
+                min(start + step, size) - 1, monitor=monitor,
+                validator=make_validator(headers), **kwargs
+            )
+            for start in range(0, size, step)
+        ]
+        for future in futures:
+            future.result()
+    checksum = hash_file(part_path, hashlib.sha256())
+    os.replace(part_path, path)
+    return make_record(url, headers, size, checksum)
+
+
+def fetch_file(session, url, path, headers, segments=1, monitor=None,
+               **kwargs):
+    """Выбирает загрузку диапазонами, если сервер их поддерживает,
+    а файл достаточно большой, иначе загружает файл одним потоком."""
+    session = transfer_session(session)
+    part_path = path.with_name(path.name + PART_FILE_SUFFIX)
+    if segments > 1 and not part_path.exists():
+        head = session.head(
+            url, headers=headers, allow_redirects=True, **kwargs
+        )
+        if head.status_code == 304:
+            return None
+        size = int(head.headers.get('Content-Length', 0))
+        if (
+            head.ok and head.headers.get('Accept-Ranges') == 'bytes'
+            and 'Content-Encoding' not in head.headers
+            and size >= SEGMENT_MIN_SIZE
+        ):
+            return download_segmented(
+                session, url, path, size, head.headers, segments, monitor,
+                **kwargs
+            )
+    return download_file(
+        session, url, path, headers, monitor=monitor, **kwargs
+    )
+
+
+def read_manifest(path):
+    """Манифест загрузок: {имя файла: запись о загрузке}."""
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_manifest(path, manifest):
+    """Атомарно записывает манифест загрузок."""
+    temp_path = path.with_name(path.name + PART_FILE_SUFFIX)
+    temp_path.write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8'
+    )
+    os.replace(temp_path, path)
+
+
+def conditional_headers(record):
+    """Заголовки условного запроса по записи из манифеста."""
+    headers = {}
+    if record.get('etag'):
+        headers['If-None-Match'] = record['etag']
+    if record.get('last_modified'):
+        headers['If-Modified-Since'] = record['last_modified']
+    return headers
+
+
+def download_archive(session, url, path, segments=1, monitor=None, **kwargs):
+    """Загружает архив, только если он изменился с прошлой загрузки.
+    Сведения о загрузках хранятся в манифесте в папке архива.
+    Возвращает запись из манифеста и признак того, что архив загружен."""
+    manifest_path = path.parent / MANIFEST_FILE_NAME
+    with MANIFEST_LOCK:
+        record = read_manifest(manifest_path).get(path.name, {})
+    headers = {}
+    if (
+        record.get('url') == url and path.exists()
+        and path.stat().st_size == record.get('size')
+    ):
+        headers = conditional_headers(record)
+    new_record = fetch_file(
+        session, url, path, headers, segments, monitor, **kwargs
+    )
+    if new_record is None:
+        return record, False
+    with MANIFEST_LOCK:
+        manifest = read_manifest(manifest_path)
+        manifest[path.name] = new_record
+        write_manifest(manifest_path, manifest)
+    return new_record, True
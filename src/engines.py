@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import (Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from functools import partial
+from multiprocessing import get_context
+
+from constants import (ASYNC_ENGINE, DEFAULT_RETRIES, DEFAULT_TIMEOUT,
+                       DEFAULT_WORKERS, EXTRACT_STAGE, PROCESS_ENGINE,
+                       RETRY_BACKOFF, SYNC_ENGINE)
+from exceptions import ParserFindTagException
+from profiling import measure, timed_call
+from utils import get_response
+
+TIMEOUT_MESSAGE = 'Превышено время ожидания ответа ({} с) от {}'
+RETRY_MESSAGE = 'Повтор {} для {} страниц с ошибкой через {} с'
+# Ошибки разбора одной страницы: они возвращаются вместо данных
+# страницы и не прерывают обход остальных.
+EXTRACT_ERRORS = (
+    ParserFindTagException, LookupError, ValueError, AttributeError
+)
+
+
+def fetch_content(session, url, **kwargs):
+    """Возвращает тело ответа или перехваченную ошибку загрузки."""
+    try:
+        return get_response(session, url, **kwargs).content
+    except ConnectionError as error:
+        return error
+
+
+def extract_record(session, url, content, extract):
+    """Извлекает данные из тела страницы функцией extract. Если страница
+    не изменилась, данные берутся из кеша извлечённых данных.
+    Возвращает перехваченную ошибку, если страницу разобрать не удалось."""
+    extraction_cache = getattr(session, 'extraction_cache', None)
+    try:
+        with measure(session, EXTRACT_STAGE, url):
+            return (
+                extract(content) if extraction_cache is None
+                else extraction_cache.extract(url, content, extract)
+            )
+    except EXTRACT_ERRORS as error:
+        return error
+
+
+def fetch_record(session, url, extract, journal=None, **kwargs):
+    """Загружает страницу и извлекает из неё данные функцией extract.
+    Извлечённые данные сразу дописываются в журнал обхода.
+    Возвращает перехваченную ошибку, если страницу загрузить
+    или разобрать не удалось."""
+    content = fetch_content(session, url, **kwargs)
+    if isinstance(content, ConnectionError):
+        return content
+    record = extract_record(session, url, content, extract)
+    if journal is not None and not isinstance(record, Exception):
+        journal.write(url, record)
+    return record
+
+
+def crawl_threads(
+    session, urls, extract, workers, timeout, processes=None, journal=None,
+    **request_kwargs
+):
+    """Загружает и разбирает страницы в пуле потоков."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            partial(
+                fetch_record,
+                session,
+                extract=extract,
+                journal=journal,
+                timeout=timeout,
+                **request_kwargs
+            ),
+            urls
+        )
+
+
+def fetch_until_abandoned(
+    session, url, extract, started, abandoned, **kwargs
+):
+    """Загрузка страницы в потоке пула для движка async: started
+    сообщает циклу событий о начале запроса, а страница, от которой
+    отказались по времени, не разбирается."""
+    started()
+    content = fetch_content(session, url, **kwargs)
+    if isinstance(content, ConnectionError) or abandoned.is_set():
+        return content
+    return extract_record(session, url, content, extract)
+
+
+async def crawl_url(
+    executor, session, url, extract, timeout, journal, request_kwargs
+):
+    """Загружает страницу в пуле потоков с ограничением по времени:
+    timeout или DEFAULT_TIMEOUT, если таймаут не задан. Время
+    отсчитывается с начала запроса, а не с постановки в очередь пула.
+    Данные, пришедшие позже, отбрасываются и не записываются
+    в журнал обхода."""
+    limit = DEFAULT_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+    abandoned = threading.Event()
+    future = loop.run_in_executor(executor, partial(
+        fetch_until_abandoned,
+        session,
+        url,
+        extract,
+        partial(loop.call_soon_threadsafe, started.set),
+        abandoned,
+        timeout=timeout,
+        **request_kwargs
+    ))
+    await started.wait()
+    try:
+        record = await asyncio.wait_for(future, limit)
+    except asyncio.TimeoutError:
+        abandoned.set()
+        return ConnectionError(TIMEOUT_MESSAGE.format(limit, url))
+    if journal is not None and not isinstance(record, Exception):
+        journal.write(url, record)
+    return record
+
+
+def crawl_async(
+    session, urls, extract, workers, timeout, processes=None, journal=None,
+    **request_kwargs
+):
+    """Загружает и разбирает страницы корутинами в пуле из workers
+    потоков и выдаёт данные в порядке URL по мере загрузки. При закрытии
+    генератора незавершённые задачи отменяются."""
+    loop = asyncio.new_event_loop()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tasks = [
+            loop.create_task(crawl_url(
+                executor, session, url, extract, timeout, journal,
+                request_kwargs
+            ))
+            for url in urls
+        ]
+        try:
+            for task in tasks:
+                yield loop.run_until_complete(task)
+        finally:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+            loop.close()
+
+
+def submit_extract(cpu_executor, extraction_cache, url, content, extract):
+    """Отправляет тело страницы на разбор в пул процессов, если данных
+    нет в кеше разбора. Возвращает ключ кеша и данные или Future."""
+    if isinstance(content, ConnectionError):
+        return None, content
+    key = None
+    if extraction_cache is not None:
+        key = extraction_cache.make_key(url, content, extract)
+        record = extraction_cache.get(key)
+        if record is not None:
+            return None, record
+    return key, cpu_executor.submit(timed_call, extract, content)
+
+
+def collect_record(extraction_cache, key, record, profiler=None, url=None):
+    """Дожидается разбора страницы и сохраняет данные в кеш разбора.
+    Время разбора в процессе передаётся профилировщику."""
+    if not isinstance(record, Future):
+        return record
+    try:
+        record, seconds = record.result()
+    except EXTRACT_ERRORS as error:
+        return error
+    if profiler is not None:
+        profiler.record(EXTRACT_STAGE, seconds, url)
+    if key is not None:
+        extraction_cache.set(key, record)
+    return record
+
+
+def process_pool(session, processes=None):
+    """Пул процессов для разбора страниц, один на запуск: создаётся
+    при первом обходе движком process, в том числе для повторов, и
+    хранится в сессии. Процессы запускаются через spawn: fork процесса
+    с работающими потоками загрузки и пулами соединений urllib3 может
+    зависнуть."""
+    pool = getattr(session, 'process_pool', None)
+    if pool is None:
+        pool = session.process_pool = ProcessPoolExecutor(
+            max_workers=processes, mp_context=get_context('spawn')
+        )
+    return pool
+
+
+def close_process_pool(session):
+    pool = getattr(session, 'process_pool', None)
+    if pool is not None:
+        pool.shutdown()
+        session.process_pool = None
+
+
+def crawl_processes(
+    session, urls, extract, workers, timeout, processes=None, journal=None,
+    **request_kwargs
+):
+    """Загружает страницы в пуле потоков, а разбирает в пуле процессов
+    сессии. В процессы передаются только байты страницы, обратно
+    возвращаются только извлечённые данные. Неизменившиеся страницы
+    не разбираются."""
+    urls = list(urls)
+    extraction_cache = getattr(session, 'extraction_cache', None)
+    cpu_executor = process_pool(session, processes)
+    with ThreadPoolExecutor(max_workers=workers) as io_executor:
+        contents = [
+            io_executor.submit(
+                fetch_content,
+                session,
+                url,
+                timeout=timeout,
+                **request_kwargs
+            )
+            for url in urls
+        ]
+        records = [
+            submit_extract(
+                cpu_executor, extraction_cache, url, future.result(), extract
+            )
+            for url, future in zip(urls, contents)
+        ]
+        for url, (key, record) in zip(urls, records):
+            record = collect_record(
+                extraction_cache, key, record,
+                getattr(session, 'profiler', None), url
+            )
+            if journal is not None and not isinstance(record, Exception):
+                journal.write(url, record)
+            yield record
+
+
+ENGINE_TO_FUNCTION = {
+    SYNC_ENGINE: crawl_threads,
+    ASYNC_ENGINE: crawl_async,
+    PROCESS_ENGINE: crawl_processes,
+}
+
+
+def run_engine(session, urls, extract, cli_args=None, journal=None,
+               **request_kwargs):
+    """Один проход движка, выбранного в аргументах командной строки."""
+    return ENGINE_TO_FUNCTION[getattr(cli_args, 'engine', SYNC_ENGINE)](
+        session,
+        urls,
+        extract,
+        workers=getattr(cli_args, 'workers', DEFAULT_WORKERS),
+        timeout=getattr(cli_args, 'timeout', None),
+        processes=getattr(cli_args, 'processes', None),
+        journal=journal,
+        **request_kwargs
+    )
+
+
+def retry_failed(
+    session, urls, records, extract, cli_args=None, journal=None,
+    **request_kwargs
+):
+    """Очередь повторов: страницы с ошибкой загрузки загружаются снова,
+    пауза перед каждым повтором вдвое больше предыдущей. Ошибки разбора
+    не повторяются: та же страница разберётся с той же ошибкой.
+    Возвращает список данных с результатом последней попытки
+    для каждой страницы."""
+    records = list(records)
+    for attempt in range(getattr(cli_args, 'retries', DEFAULT_RETRIES)):
+        failed = [
+            index for index, record in enumerate(records)
+            if isinstance(record, ConnectionError)
+        ]
+        if not failed:
+            break
+        delay = RETRY_BACKOFF * 2 ** attempt
+        logging.info(RETRY_MESSAGE.format(attempt + 1, len(failed), delay))
+        time.sleep(delay)
+        for index, record in zip(failed, run_engine(
+            session,
+            [urls[index] for index in failed],
+            extract,
+            cli_args,
+            journal,
+            **request_kwargs
+        )):
+            records[index] = record
+    return records
+
+
+def stream_retried(
+    session, urls, records, extract, cli_args=None, journal=None,
+    **request_kwargs
+):
+    """Данные страниц в порядке URL по мере загрузки. После первой
+    страницы с ошибкой загрузки данные копятся до конца прохода
+    и выдаются после повторов, чтобы сохранить порядок URL."""
+    records = iter(records)
+    failed = []
+    for record in records:
+        if isinstance(record, ConnectionError):
+            failed.append(record)
+            break
+        yield record
+    failed.extend(records)
+    if failed:
+        yield from retry_failed(
+            session, urls[len(urls) - len(failed):], failed, extract,
+            cli_args, journal, **request_kwargs
+        )
+
+
+def merge_records(urls, done, records):
+    """Данные из журнала и данные загруженных страниц в порядке URL."""
+    records = iter(records)
+    for url in urls:
+        yield done[url] if url in done else next(records)
+
+
+def iter_crawl(
+    session, urls, extract, cli_args=None, journal=None, **request_kwargs
+):
+    """Загружает страницы движком, выбранным в аргументах командной строки,
+    и выдаёт извлечённые данные в порядке URL по мере загрузки. Страницы,
+    уже записанные в журнал обхода, не загружаются. Вместо данных
+    страницы, которую не удалось загрузить или разобрать и после
+    повторов, выдаётся ошибка. request_kwargs передаются в запрос каждой
+    страницы."""
+    urls = list(urls)
+    done = {} if journal is None else journal.records
+    pending = [url for url in urls if url not in done]
+    run_metrics = getattr(session, 'run_metrics', None)
+    for record in merge_records(urls, done, stream_retried(
+        session,
+        pending,
+        run_engine(
+            session, pending, extract, cli_args, journal, **request_kwargs
+        ),
+        extract,
+        cli_args,
+        journal,
+        **request_kwargs
+    )):
+        if run_metrics is not None and isinstance(record, Exception):
+            run_metrics.add('item_errors')
+        yield record
+
+
+def crawl(
+    session, urls, extract, cli_args=None, journal=None, **request_kwargs
+):
+    """Список данных страниц в порядке URL, см. iter_crawl."""
+    return list(iter_crawl(
+        session, urls, extract, cli_args, journal, **request_kwargs
+    ))
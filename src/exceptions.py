@@ -1,2 +1,6 @@
 class ParserFindTagException(Exception):
     """Вызывается, когда парсер не может найти тег."""
+
+
+class ParserDownloadException(Exception):
+    """Вызывается, когда файл загружен не полностью."""
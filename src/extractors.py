@@ -0,0 +1,39 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+from utils import find_next_sibling_tag, find_tag, find_tag_by_text
+
+# Увеличивается при любом изменении извлечения данных:
+# записи кеша разбора прежней версии удаляются.
+EXTRACTION_VERSION = 1
+
+WHATS_NEW_STRAINER = SoupStrainer(['h1', 'dl'])
+PEP_STATUS_STRAINER = SoupStrainer('dl')
+
+
+def extract_whats_new(content, features='lxml', encoding='utf-8'):
+    """Заголовок и автор со страницы «Что нового».
+    Разбираются только теги <h1> и <dl>."""
+    soup = BeautifulSoup(
+        content,
+        features=features,
+        parse_only=WHATS_NEW_STRAINER,
+        from_encoding=encoding
+    )
+    return (
+        find_tag(soup, 'h1').text,
+        find_tag(soup, 'dl').text.replace('\n', ' ')
+    )
+
+
+def extract_pep_status(content, features='lxml', encoding='utf-8'):
+    """Статус из карточки на странице PEP.
+    Разбираются только теги <dl>."""
+    soup = BeautifulSoup(
+        content,
+        features=features,
+        parse_only=PEP_STATUS_STRAINER,
+        from_encoding=encoding
+    )
+    return find_next_sibling_tag(
+        find_tag_by_text(soup, 'dt', 'Status:'), 'dd'
+    ).text
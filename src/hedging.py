@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from constants import HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, HEDGE_WINDOW
+
+
+class LatencyTracker:
+    """Скользящее окно времени ответов для расчёта перцентиля."""
+
+    def __init__(self, window=HEDGE_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+
+    def percentile(self, percent=HEDGE_PERCENTILE,
+                   min_samples=HEDGE_MIN_SAMPLES):
+        """Перцентиль времени ответа или None, пока замеров мало."""
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[min(
+            len(latencies) - 1, int(len(latencies) * percent / 100)
+        )]
+
+
+class Hedger:
+    """Дублирующие запросы: если ответ не пришёл за p95 времени ответа,
+    тот же запрос отправляется ещё раз и используется первый пришедший
+    ответ. Прервать запрос в потоке нельзя, поэтому опоздавший ответ
+    закрывается сразу по приходе и возвращает соединение в пул."""
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.tracker = LatencyTracker()
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.won = 0
+        self.saved = 0.0
+
+    def timed(self, send):
+        start = time.monotonic()
+        response = send()
+        self.tracker.add(time.monotonic() - start)
+        return response
+
+    def send(self, send):
+        """Выполняет send(), при задержке дублируя его."""
+        delay = self.tracker.percentile()
+        if delay is None:
+            return self.timed(send)
+        primary = self.executor.submit(self.timed, send)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        hedge = self.executor.submit(self.timed, send)
+        with self.lock:
+            self.sent += 1
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else hedge
+        loser = hedge if winner is primary else primary
+        if winner.exception() is not None:
+            winner, loser = loser, winner
+            winner.exception()
+        finished = time.monotonic()
+        if winner is hedge:
+            with self.lock:
+                self.won += 1
+        loser.add_done_callback(
+            lambda future: self.discard(future, winner is hedge, finished)
+        )
+        return winner.result()
+
+    def discard(self, future, hedge_won, finished):
+        """Закрывает опоздавший ответ и учитывает сэкономленное время."""
+        if future.exception() is not None:
+            return
+        future.result().close()
+        if hedge_won:
+            with self.lock:
+                self.saved += time.monotonic() - finished
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,267 @@
+import datetime as dt
+import json
+import logging
+import sqlite3
+import threading
+
+from prettytable import PrettyTable
+
+from configs import configure_history_parser, configure_logging
+from constants import BASE_DIR, HISTORY_DB_NAME, OUTPUT_BATCH_SIZE
+
+CREATE_HISTORY_SQL = (
+    'CREATE TABLE IF NOT EXISTS runs '
+    '(id INTEGER PRIMARY KEY, mode TEXT NOT NULL, started TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS runs_mode ON runs (mode, started)',
+    'CREATE TABLE IF NOT EXISTS items '
+    '(mode TEXT NOT NULL, key TEXT NOT NULL, record TEXT NOT NULL, '
+    'first_run INTEGER NOT NULL, last_run INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS items_key ON items (mode, key, last_run)',
+    'CREATE INDEX IF NOT EXISTS items_runs '
+    'ON items (mode, last_run, first_run)',
+)
+CREATE_PENDING_SQL = (
+    'CREATE TEMP TABLE IF NOT EXISTS pending '
+    '(key TEXT PRIMARY KEY, record TEXT NOT NULL)'
+)
+# Записи, которые были в запуске run режима mode.
+RUN_ITEMS_SQL = (
+    'SELECT key, record FROM items '
+    'WHERE mode = :mode AND last_run >= {run} AND first_run <= {run}'
+)
+DIFF_SQL = (
+    'WITH old AS ({old}), new AS ({new}) '
+    'SELECT old.key, old.record, new.record FROM old '
+    'LEFT JOIN new USING (key) '
+    'WHERE new.record IS NULL OR new.record != old.record '
+    'UNION ALL '
+    'SELECT new.key, NULL, new.record FROM new '
+    'WHERE new.key NOT IN (SELECT key FROM old) '
+    'ORDER BY 1'
+).format(
+    old=RUN_ITEMS_SQL.format(run=':old'), new=RUN_ITEMS_SQL.format(run=':new')
+)
+RUN_NOT_FOUND_MESSAGE = 'Не найден запуск {} режима {}'
+KEY_REQUIRED_MESSAGE = 'Для команды history нужен ключ записи --key'
+RUNS_FIELDS = ('Запуск', 'Время', 'Записей')
+DIFF_FIELDS = ('Ключ', 'Было', 'Стало')
+KEY_HISTORY_FIELDS = ('Значение', 'С запуска', 'По запуск')
+
+
+def dump_record(record):
+    return json.dumps(record, ensure_ascii=False)
+
+
+def load_record(record):
+    if record is None:
+        return None
+    record = json.loads(record)
+    return tuple(record) if isinstance(record, list) else record
+
+
+class RunStore:
+    """История запусков: записи (ключ, значение) каждого запуска режима.
+    Одинаковые записи соседних запусков хранятся один раз с номерами
+    первого и последнего запуска, поэтому неизменившиеся записи не
+    занимают места, а разница любых двух запусков выбирается по индексу."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA temp_store=MEMORY')
+        for sql in CREATE_HISTORY_SQL:
+            self.connection.execute(sql)
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def begin(self):
+        """Начинает запись нового запуска."""
+        with self.lock:
+            self.pending = []
+            self.connection.execute(CREATE_PENDING_SQL)
+            self.connection.execute('DELETE FROM pending')
+
+    def add(self, key, record):
+        with self.lock:
+            self.pending.append((key, dump_record(record)))
+            if len(self.pending) >= OUTPUT_BATCH_SIZE:
+                self.flush_pending()
+
+    def flush_pending(self):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO pending VALUES (?, ?)', self.pending
+        )
+        self.pending = []
+
+    def commit(self, mode):
+        """Сохраняет записи запуска одной транзакцией. Записи, совпавшие
+        с записями прошлого запуска режима, продлеваются до нового
+        запуска. Возвращает номер запуска, число новых и изменившихся
+        записей и число исчезнувших."""
+        with self.lock:
+            self.flush_pending()
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                previous = self.connection.execute(
+                    'SELECT MAX(id) FROM runs WHERE mode = ?', (mode,)
+                ).fetchone()[0]
+                run = self.connection.execute(
+                    'INSERT INTO runs (mode, started) VALUES (?, ?)',
+                    (mode, dt.datetime.now().isoformat(timespec='seconds'))
+                ).lastrowid
+                self.connection.execute(
+                    'UPDATE items SET last_run = :run '
+                    'WHERE mode = :mode AND last_run = :previous '
+                    'AND EXISTS (SELECT 1 FROM pending '
+                    'WHERE pending.key = items.key '
+                    'AND pending.record = items.record)',
+                    {'run': run, 'mode': mode, 'previous': previous}
+                )
+                changed = self.connection.execute(
+                    'INSERT INTO items '
+                    'SELECT :mode, key, record, :run, :run FROM pending '
+                    'WHERE NOT EXISTS (SELECT 1 FROM items '
+                    'WHERE items.mode = :mode AND items.key = pending.key '
+                    'AND items.last_run = :run)',
+                    {'run': run, 'mode': mode}
+                ).rowcount
+                removed = self.connection.execute(
+                    'SELECT COUNT(*) FROM items '
+                    'WHERE mode = ? AND last_run = ? '
+                    'AND key NOT IN (SELECT key FROM pending)',
+                    (mode, previous)
+                ).fetchone()[0]
+                self.connection.execute('DELETE FROM pending')
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+        return run, changed, removed
+
+    def runs(self, mode):
+        """Запуски режима: номер, время и число записей."""
+        return self.connection.execute(
+            'SELECT id, started, (SELECT COUNT(*) FROM items '
+            'WHERE items.mode = runs.mode AND last_run >= runs.id '
+            'AND first_run <= runs.id) '
+            'FROM runs WHERE mode = ? ORDER BY id',
+            (mode,)
+        ).fetchall()
+
+    def resolve(self, mode, spec=None, offset=0):
+        """Номер запуска по номеру или по дате и времени в формате ISO:
+        последний запуск не позже этого момента. Без spec — запуск
+        offset от последнего."""
+        if spec is None:
+            row = self.connection.execute(
+                'SELECT id FROM runs WHERE mode = ? '
+                'ORDER BY id DESC LIMIT 1 OFFSET ?',
+                (mode, offset)
+            ).fetchone()
+        elif spec.isdigit():
+            row = self.connection.execute(
+                'SELECT id FROM runs WHERE mode = ? AND id = ?',
+                (mode, int(spec))
+            ).fetchone()
+        else:
+            row = self.connection.execute(
+                'SELECT id FROM runs WHERE mode = ? AND started <= ? '
+                'ORDER BY started DESC, id DESC LIMIT 1',
+                (mode, dt.datetime.fromisoformat(spec).isoformat())
+            ).fetchone()
+        if row is None:
+            raise LookupError(RUN_NOT_FOUND_MESSAGE.format(
+                spec or f'-{offset + 1}', mode
+            ))
+        return row[0]
+
+    def diff(self, mode, old, new):
+        """Изменения между запусками old и new: (ключ, было, стало).
+        Для появившейся записи «было» — None, для исчезнувшей «стало» —
+        None."""
+        return [
+            (key, load_record(old_record), load_record(new_record))
+            for key, old_record, new_record in self.connection.execute(
+                DIFF_SQL, {'mode': mode, 'old': old, 'new': new}
+            )
+        ]
+
+    def key_history(self, mode, key):
+        """Значения записи key по запускам: (значение, с, по)."""
+        return [
+            (load_record(record), first_run, last_run)
+            for record, first_run, last_run in self.connection.execute(
+                'SELECT record, first_run, last_run FROM items '
+                'WHERE mode = ? AND key = ? ORDER BY first_run',
+                (mode, key)
+            )
+        ]
+
+    def close(self):
+        self.connection.close()
+
+
+def record_item(session, key, record):
+    """Добавляет запись в историю запуска, если она ведётся.
+    История своя у каждого потока, в котором выполняется режим."""
+    store = getattr(getattr(session, 'run_history', None), 'store', None)
+    if store is not None:
+        store.add(key, record)
+
+
+def open_history(path=None):
+    return RunStore(path or BASE_DIR / HISTORY_DB_NAME)
+
+
+def make_table(field_names, rows):
+    table = PrettyTable()
+    table.field_names = field_names
+    table.align = 'l'
+    table.add_rows(rows)
+    return table
+
+
+def show_runs(store, args):
+    return make_table(RUNS_FIELDS, store.runs(args.mode))
+
+
+def show_diff(store, args):
+    return make_table(DIFF_FIELDS, store.diff(
+        args.mode,
+        store.resolve(args.mode, args.old, offset=1),
+        store.resolve(args.mode, args.new)
+    ))
+
+
+def show_key_history(store, args):
+    return make_table(
+        KEY_HISTORY_FIELDS, store.key_history(args.mode, args.key)
+    )
+
+
+COMMAND_TO_FUNCTION = {
+    'runs': show_runs,
+    'diff': show_diff,
+    'history': show_key_history,
+}
+
+
+def main():
+    configure_logging()
+    parser = configure_history_parser(COMMAND_TO_FUNCTION.keys())
+    args = parser.parse_args()
+    if args.command == 'history' and args.key is None:
+        parser.error(KEY_REQUIRED_MESSAGE)
+    store = open_history()
+    try:
+        print(COMMAND_TO_FUNCTION[args.command](store, args))
+    except (LookupError, ValueError) as error:
+        logging.error(error)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import json
+import threading
+
+
+def read_journal(path):
+    """Записи журнала: {URL: извлечённые данные}. Строка, оборванная
+    при аварийном завершении, пропускается."""
+    records = {}
+    try:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                record = entry['record']
+                records[entry['url']] = (
+                    tuple(record) if isinstance(record, list) else record
+                )
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class Journal:
+    """Журнал обхода: каждая обработанная страница дописывается строкой
+    JSON сразу после разбора. При продолжении (resume) записи прошлого
+    запуска загружаются в records, и эти страницы не запрашиваются;
+    без него записи прошлого запуска не загружаются, но и не стираются.
+    После успешного обхода журнал удаляется, после ошибки — остаётся."""
+
+    def __init__(self, path, resume=False):
+        path.parent.mkdir(exist_ok=True)
+        self.path = path
+        self.records = read_journal(path) if resume else {}
+        self.file = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def forget(self, urls):
+        """Страницы urls больше не считаются обработанными
+        и при обходе загружаются снова."""
+        for url in urls:
+            self.records.pop(url, None)
+
+    def write(self, url, record):
+        line = json.dumps({'url': url, 'record': record}, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        self.close()
+        if exc_type is None:
+            self.path.unlink()
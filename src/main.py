@@ -1,27 +1,68 @@
 import logging
 import re
+import threading
+import time
+from argparse import Namespace
 from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from urllib.parse import urljoin
 
-import requests_cache
+from bs4 import SoupStrainer
 from tqdm import tqdm
 
-from configs import configure_argument_parser, configure_logging
+from configs import (
+    configure_argument_parser,
+    configure_logging,
+    configure_session
+    )
 from constants import (
+    ALL_FORMATS,
+    ALL_MODES,
     BASE_DIR,
+    CACHE_FRESH,
+    CACHE_REFETCHED,
+    CACHE_REVALIDATED,
+    DEFAULT_DOWNLOAD_FORMATS,
+    DEFAULT_SEGMENTS,
+    DEFAULT_WORKERS,
+    DOWNLOAD_FORMATS,
     DOWNLOADS_DIR_NAME,
     EXPECTED_STATUS,
+    FINAL_PEP_EXPIRE_AFTER,
+    FINAL_TABLE_STATUS,
+    HISTORY_DB_NAME,
+    HTML_SOURCE,
+    JOURNAL_FILE_NAME,
+    JOURNALS_DIR_NAME,
+    JSON_SOURCE,
     MAIN_DOC_URL,
-    PEPS_URL
+    MODE_STAGE,
+    OUTPUT_STAGE,
+    PEP_PAGE_PATH,
+    PEPS_JSON_PATH,
+    PEPS_URL,
+    SNAPSHOT_FILE_NAME
     )
+from downloads import TransferMonitor, download_archive
+from engines import close_process_pool, iter_crawl
 from exceptions import ParserFindTagException
-from outputs import control_output
-from utils import find_next_sibling_tag, find_tag, get_soup
+from extractors import extract_pep_status, extract_whats_new
+from history import open_history, record_item
+from journal import Journal
+from metrics import collect_metrics, write_metrics
+from outputs import CONSOLE_OUTPUTS, control_output
+from profiling import TimedIterator, measure
+from snapshots import diff_snapshot, make_entry, read_snapshot, write_snapshot
+from utils import find_tag, get_response, get_soup
 
 LATEST_VERSIONS_MESSAGE = (
     'Не найден тег <ul> c текстом {} на странице: {}'
 )
-DOWNLOAD_MESSAGE = 'Архив был загружен и сохранён: {}'
+DOWNLOAD_MESSAGE = 'Архив был загружен и сохранён: {} (sha256 {})'
+NOT_MODIFIED_MESSAGE = 'Архив не изменился, загрузка пропущена: {} (sha256 {})'
+DOWNLOAD_ERROR_MESSAGE = 'Не удалось загрузить архив {}: {}'
 PEP_TQDM_MESSAGE = 'Парсим статусы PEP'
 PEP_MESSAGE = (
     'Несовпадающие статусы: {}\n'
@@ -32,42 +73,126 @@ START_MESSAGE = 'Парсер запущен!'
 END_MESSAGE = 'Парсер завершил работу.'
 ERROR_MESSAGE = 'Ошибка в работе парсера: {}'
 ARGS_MESSAGE = 'Аргументы командной строки: {}'
+MODE_ERROR_MESSAGE = 'Ошибка в режиме {}: {}'
+CACHE_STATS_MESSAGE = (
+    'Страниц из кеша: {}, подтверждено сервером (304): {}, '
+    'загружено заново: {}'
+)
+EXTRACTION_STATS_MESSAGE = (
+    'Данных страниц из кеша разбора: {}, разобрано страниц: {}'
+)
+RATE_MESSAGE = 'Частота запросов к {}: {:.1f} в секунду'
+HEDGE_MESSAGE = (
+    'Дублирующих запросов: {}, из них ответили первыми: {}, '
+    'сэкономлено: {:.2f} с'
+)
+PROFILE_MESSAGE = 'Время этапов работы парсера:\n{}'
+PROFILE_DUMP_MESSAGE = 'Статистика cProfile сохранена: {}'
+HISTORY_SAVED_MESSAGE = (
+    'Запуск {} режима {} сохранён в истории: '
+    'новых и изменившихся записей {}, исчезнувших {}'
+)
+METRICS_SAVED_MESSAGE = 'Метрики запуска сохранены: {}'
+CACHE_EVICTED_MESSAGE = 'Удалено из кеша давно не запрошенных страниц: {}'
 WHATS_NEW_RESULTS = ('Ссылка на статью', 'Заголовок', 'Редактор, автор')
 LATEST_VERSIONS_RESULTS = ('Ссылка на документацию', 'Версия', 'Статус')
 PEP_RESULTS = ('Статус', 'Количество')
 TOTAL_PEP = 'Итого'
+WHATS_NEW_STRAINER = SoupStrainer(id='what-s-new-in-python')
+LATEST_VERSIONS_STRAINER = SoupStrainer(
+    'div', attrs={'class': re.compile(r'\bsphinxsidebarwrapper\b')}
+)
+DOWNLOAD_STRAINER = SoupStrainer(
+    'table', attrs={'class': re.compile(r'\bdocutils\b')}
+)
+PEP_ZERO_STRAINER = SoupStrainer(
+    'table', attrs={'class': re.compile(r'\bpep-zero-table\b')}
+)
+PEPS_JSON_MESSAGE = (
+    'Не удалось загрузить статусы PEP из {}: {}. '
+    'Статусы будут взяты со страниц PEP'
+)
+SNAPSHOT_MESSAGE = (
+    'Новых PEP: {}, с изменившейся строкой таблицы: {}, '
+    'перепроверено по сроку: {}, удалено из таблицы: {}, из снимка: {}'
+)
+STATUS_CHANGED_MESSAGE = 'Статус на странице PEP изменился: {} {} -> {}'
+RESUME_MESSAGE = 'Страниц из журнала прерванного обхода {}: {}'
+JOURNAL_KEPT_MESSAGE = (
+    'Найден журнал прерванного обхода {} ({}); он сохранён, '
+    'продолжить обход можно с опцией --resume'
+)
+PEP_ROW_MESSAGE = 'Пропущена строка таблицы PEP 0: {}'
+UNKNOWN_STATUS_MESSAGE = 'Неизвестный статус в таблице PEP 0: {} {!r}'
+FAILED_ITEMS_MESSAGE = (
+    'Не удалось обработать {} из {}; '
+    'в таблицу результатов вошли только обработанные'
+)
 GET_SOUP_MESSAGE = 'Не удалось получить объёкт BeautifulSoup от URL {}: {}'
 
 
-def whats_new(session):
+def open_journal(name, cli_args=None):
+    """Журнал обхода режима name. С опцией --resume записи
+    прерванного обхода загружаются, иначе журнал прерванного обхода
+    сохраняется и пополняется, о чём выводится предупреждение."""
+    path = BASE_DIR / JOURNALS_DIR_NAME / JOURNAL_FILE_NAME.format(name)
+    resume = getattr(cli_args, 'resume', False)
+    if not resume and path.exists():
+        logging.warning(JOURNAL_KEPT_MESSAGE.format(name, path))
+    journal = Journal(path, resume)
+    if journal.records:
+        logging.info(RESUME_MESSAGE.format(name, len(journal.records)))
+    return journal
+
+
+def iter_whats_new(session, cli_args=None):
+    """Строки результатов режима whats-new по мере загрузки страниц,
+    первая строка — заголовок."""
     whats_new_url = urljoin(MAIN_DOC_URL, 'whatsnew/')
-    a_tags = get_soup(session, whats_new_url).select(
-        '#what-s-new-in-python div.toctree-wrapper li.toctree-l1 a'
-    )[:]
-    results = [WHATS_NEW_RESULTS]
+    version_links = [
+        urljoin(whats_new_url, a_tag['href'])
+        for a_tag in get_soup(
+            session, whats_new_url, parse_only=WHATS_NEW_STRAINER
+        ).select(
+            '#what-s-new-in-python div.toctree-wrapper li.toctree-l1 a'
+        )
+    ]
+    yield WHATS_NEW_RESULTS
     exception_messages = []
-    for a_tag in tqdm(a_tags):
-        version_link = urljoin(whats_new_url, a_tag['href'])
-        try:
-            soup = get_soup(session, version_link)
-        except ConnectionError as error:
-            exception_messages.append(
-                GET_SOUP_MESSAGE.format(version_link, error)
+    with open_journal('whats-new', cli_args) as journal:
+        for version_link, record in tqdm(
+            zip(
+                version_links,
+                iter_crawl(
+                    session, version_links, extract_whats_new, cli_args,
+                    journal
                 )
-            continue
-        results.append((
-            version_link,
-            find_tag(soup, 'h1').text,
-            find_tag(soup, 'dl').text.replace('\n', ' ')
-        ))
+            ),
+            total=len(version_links)
+        ):
+            if isinstance(record, Exception):
+                exception_messages.append(
+                    GET_SOUP_MESSAGE.format(version_link, record)
+                    )
+                continue
+            record_item(session, version_link, record)
+            yield (version_link, *record)
     list(map(logging.exception, exception_messages))
-    return results
+    if exception_messages:
+        logging.warning(FAILED_ITEMS_MESSAGE.format(
+            len(exception_messages), len(version_links)
+        ))
 
 
-def latest_versions(session):
-    ul_tags = (
-        get_soup(session, MAIN_DOC_URL).select('div.sphinxsidebarwrapper ul')
-    )
+def whats_new(session, cli_args=None):
+    return list(iter_whats_new(session, cli_args))
+
+
+def iter_latest_versions(session, cli_args=None):
+    """Строки результатов режима latest-versions, первая — заголовок."""
+    ul_tags = get_soup(
+        session, MAIN_DOC_URL, parse_only=LATEST_VERSIONS_STRAINER
+    ).select('div.sphinxsidebarwrapper ul')
     search_text = 'All versions'
     for ul in ul_tags:
         if search_text in ul.text:
@@ -77,7 +202,7 @@ def latest_versions(session):
         raise ParserFindTagException(
             LATEST_VERSIONS_MESSAGE.format(search_text, MAIN_DOC_URL)
         )
-    results = [LATEST_VERSIONS_RESULTS]
+    yield LATEST_VERSIONS_RESULTS
     pattern = r'Python (?P<version>\d\.\d+) \((?P<status>.*)\)'
     for a_tag in a_tags:
         text_match = re.search(pattern, a_tag.text)
@@ -85,67 +210,279 @@ def latest_versions(session):
             version, status = text_match.groups()
         else:
             version, status = a_tag.text, ''
-        results.append((a_tag['href'], version, status))
-    return results
+        record_item(session, a_tag['href'], (version, status))
+        yield a_tag['href'], version, status
+
 
+def latest_versions(session, cli_args=None):
+    return list(iter_latest_versions(session, cli_args))
 
-def download(session):
+
+def find_archive_links(table, downloads_url, formats):
+    """Ссылки на архивы выбранных форматов из таблицы загрузок.
+    Для all берутся все найденные в таблице архивы известных форматов."""
+    if ALL_FORMATS in formats:
+        return list(dict.fromkeys(
+            urljoin(downloads_url, a_tag['href'])
+            for a_tag in table.find_all('a', href=True)
+            if a_tag['href'].endswith(DOWNLOAD_FORMATS)
+        ))
+    return list(dict.fromkeys(
+        urljoin(downloads_url, find_tag(
+            table, 'a', {'href': re.compile(r'.+{}$'.format(re.escape(fmt)))}
+        )['href'])
+        for fmt in formats
+    ))
+
+
+def download(session, cli_args=None):
+    """Загружает архивы документации выбранных форматов. Ошибка
+    загрузки одного архива выводится в лог и учитывается в метриках,
+    остальные архивы загружаются."""
     downloads_url = urljoin(MAIN_DOC_URL, 'download.html')
     table = find_tag(
-        get_soup(session, downloads_url), 'table', {'class': 'docutils'}
+        get_soup(session, downloads_url, parse_only=DOWNLOAD_STRAINER),
+        'table',
+        {'class': 'docutils'}
+    )
+    archive_links = find_archive_links(
+        table,
+        downloads_url,
+        getattr(cli_args, 'formats', DEFAULT_DOWNLOAD_FORMATS)
     )
-    pdf_a4_tag = find_tag(table, 'a', {'href': re.compile(r'.+pdf-a4\.zip$')})
-    pdf_a4_link = urljoin(downloads_url, pdf_a4_tag['href'])
-    file_name = pdf_a4_link.split('/')[-1]
     downloads_dir = BASE_DIR / DOWNLOADS_DIR_NAME
     downloads_dir.mkdir(exist_ok=True)
-    archive_path = downloads_dir / file_name
-    response = session.get(pdf_a4_link)
-    with open(archive_path, 'wb') as file:
-        file.write(response.content)
-    logging.info(DOWNLOAD_MESSAGE.format(archive_path))
+    with TransferMonitor(getattr(cli_args, 'limit_rate', None)) as monitor, \
+            ThreadPoolExecutor(
+                max_workers=getattr(cli_args, 'workers', DEFAULT_WORKERS)
+            ) as executor:
+        futures = [
+            executor.submit(
+                download_archive,
+                session,
+                link,
+                downloads_dir / link.split('/')[-1],
+                segments=getattr(cli_args, 'segments', DEFAULT_SEGMENTS),
+                monitor=monitor,
+                timeout=getattr(cli_args, 'timeout', None)
+            )
+            for link in archive_links
+        ]
+        run_metrics = getattr(session, 'run_metrics', None)
+        for link, future in zip(archive_links, futures):
+            try:
+                record, downloaded = future.result()
+            except Exception as error:
+                logging.exception(
+                    DOWNLOAD_ERROR_MESSAGE.format(link, error), stack_info=True
+                )
+                if run_metrics is not None:
+                    run_metrics.add('item_errors')
+                continue
+            logging.info(
+                (DOWNLOAD_MESSAGE if downloaded else NOT_MODIFIED_MESSAGE)
+                .format(downloads_dir / link.split('/')[-1], record['sha256'])
+            )
+        if run_metrics is not None:
+            run_metrics.add('downloaded_bytes', monitor.bar.n)
 
 
-def pep(session):
-    status_counter = defaultdict(int)
-    exception_messages = []
-    info_messages = []
-    for tr_tag in tqdm(
-        [
-            tr for tr in get_soup(session, PEPS_URL).find_all('tr')
-            if tr.find_parent(
-                'table', class_='pep-zero-table docutils align-default'
-            )
-        ][:],
-        desc=PEP_TQDM_MESSAGE
+def load_json_statuses(session):
+    """Статусы всех PEP из JSON-документа сайта PEP по ссылкам на PEP."""
+    peps_json_url = urljoin(PEPS_URL, PEPS_JSON_PATH)
+    try:
+        return {
+            urljoin(PEPS_URL, PEP_PAGE_PATH.format(int(number))):
+                pep_data['status']
+            for number, pep_data in get_response(
+                session, peps_json_url
+            ).json().items()
+        }
+    except (ConnectionError, ValueError, KeyError) as error:
+        logging.warning(PEPS_JSON_MESSAGE.format(peps_json_url, error))
+        return {}
+
+
+def get_page_statuses(
+    session, peps, cli_args=None, journal=None, **request_kwargs
+):
+    """Статусы со страниц PEP парами (ссылка, статус) по мере загрузки.
+    С источником json статусы берутся из одного документа, а страницы
+    загружаются только для PEP, которых в нём нет. Страницы PEP
+    в статусе Final хранятся в кеше дольше остальных, поэтому статус
+    Final у PEP с другой буквой в таблице загружается заново в обход
+    кеша, даже если он взят из журнала прерванного обхода: PEP мог
+    сменить статус, пока страница хранилась в кеше. Статусы со страниц
+    записываются в журнал обхода, request_kwargs передаются в запрос
+    каждой страницы."""
+    statuses = {}
+    if getattr(cli_args, 'pep_source', HTML_SOURCE) == JSON_SOURCE:
+        statuses = load_json_statuses(session)
+    yield from ((link, statuses[link]) for link, _ in peps if link in statuses)
+    final_links = [
+        link for link, table_status in peps
+        if table_status == FINAL_TABLE_STATUS and link not in statuses
+    ]
+    yield from zip(final_links, iter_crawl(
+        session,
+        final_links,
+        extract_pep_status,
+        cli_args,
+        journal,
+        expire_after=FINAL_PEP_EXPIRE_AFTER,
+        **request_kwargs
+    ))
+    missing_links = [
+        link for link, table_status in peps
+        if table_status != FINAL_TABLE_STATUS and link not in statuses
+    ]
+    stale_links = []
+    for link, status in zip(missing_links, iter_crawl(
+        session, missing_links, extract_pep_status, cli_args, journal,
+        **request_kwargs
+    )):
+        if status in EXPECTED_STATUS[FINAL_TABLE_STATUS]:
+            stale_links.append(link)
+            continue
+        yield link, status
+    if journal is not None:
+        journal.forget(stale_links)
+    yield from zip(stale_links, iter_crawl(
+        session, stale_links, extract_pep_status, cli_args, journal,
+        force_refresh=True, **request_kwargs
+    ))
+
+
+def get_incremental_statuses(session, peps, cli_args=None, journal=None):
+    """Статусы со страниц PEP с учётом снимка прошлого запуска парами
+    (ссылка, статус). Загружаются только новые PEP, PEP с изменившейся
+    строкой таблицы PEP 0 и PEP с устаревшей записью снимка, остальные
+    статусы берутся из снимка и выдаются первыми. Страницы PEP
+    с изменившейся строкой перепроверяются на сервере, даже если они
+    ещё свежие в кеше. Новый снимок записывается после выдачи всех
+    статусов."""
+    snapshot_path = BASE_DIR / SNAPSHOT_FILE_NAME
+    snapshot = read_snapshot(snapshot_path)
+    new, changed, expired, removed = diff_snapshot(snapshot, peps)
+    checked = new + changed + expired
+    checked_links = {link for link, _ in checked}
+    for link, _ in peps:
+        if link not in checked_links:
+            yield link, snapshot[link]['page_status']
+    statuses = {}
+    for link, status in chain(
+        get_page_statuses(session, new + expired, cli_args, journal),
+        get_page_statuses(session, changed, cli_args, journal, refresh=True)
     ):
+        statuses[link] = status
+        if (
+            link in snapshot and not isinstance(status, Exception)
+            and snapshot[link]['page_status'] != status
+        ):
+            logging.info(STATUS_CHANGED_MESSAGE.format(
+                link, snapshot[link]['page_status'], status
+            ))
+        yield link, status
+    new_snapshot = {}
+    for link, table_status in peps:
+        status = statuses.get(link)
+        if status is not None and not isinstance(status, Exception):
+            new_snapshot[link] = make_entry(table_status, status)
+        elif link in snapshot:
+            new_snapshot[link] = snapshot[link]
+    write_snapshot(snapshot_path, new_snapshot)
+    logging.info(SNAPSHOT_MESSAGE.format(
+        len(new), len(changed), len(expired), len(removed),
+        len(peps) - len(checked)
+    ))
+
+
+def get_pep_rows(session):
+    """Ссылки на PEP и буквы статуса из таблицы PEP 0, а также сообщения
+    о строках, которые разобрать не удалось."""
+    peps = []
+    exception_messages = []
+    for tr_tag in [
+        tr for tr in get_soup(
+            session, PEPS_URL, parse_only=PEP_ZERO_STRAINER
+        ).find_all('tr')
+        if tr.find_parent(
+            'table', class_='pep-zero-table docutils align-default'
+        )
+    ]:
         if tr_tag.find('th') is not None:
             continue
-        link = urljoin(PEPS_URL, find_tag(tr_tag, 'a')['href'])
-        td_tag = find_tag(tr_tag, 'td')
-        peps_page_statuses = td_tag.text[1:]
         try:
-            soup = get_soup(session, link)
-        except ConnectionError as error:
-            exception_messages.append(GET_SOUP_MESSAGE.format(link, error))
-            continue
-        for dt_tag in soup.find_all('dt'):
-            if dt_tag.text == 'Status:':
-                pep_page_status = find_next_sibling_tag(dt_tag, 'dd').text
-                break
-        expected_status = EXPECTED_STATUS[peps_page_statuses]
-        if pep_page_status not in expected_status:
-            info_messages.append(
-                PEP_MESSAGE.format(link, pep_page_status, expected_status)
+            peps.append((
+                urljoin(PEPS_URL, find_tag(tr_tag, 'a')['href']),
+                find_tag(tr_tag, 'td').text[1:]
+            ))
+        except (ParserFindTagException, KeyError) as error:
+            exception_messages.append(PEP_ROW_MESSAGE.format(error))
+    return peps, exception_messages
+
+
+def iter_pep(session, cli_args=None):
+    """Строки результатов режима pep. Заголовок выдаётся после разбора
+    таблицы PEP 0, количество PEP по статусам — после проверки всех PEP
+    в порядке первого появления статуса в таблице. Статусы приходят
+    по мере загрузки страниц, прогресс-бар показывает ход обхода."""
+    status_counter = defaultdict(int)
+    info_messages = []
+    peps, exception_messages = get_pep_rows(session)
+    total = len(peps) + len(exception_messages)
+    yield PEP_RESULTS
+    table_statuses = dict(peps)
+    positions = {}
+    for position, (link, _) in enumerate(peps):
+        positions.setdefault(link, position)
+    first_positions = {}
+    with open_journal('pep', cli_args) as journal:
+        for link, pep_page_status in tqdm(
+            (
+                get_incremental_statuses
+                if getattr(cli_args, 'incremental', False)
+                else get_page_statuses
+            )(session, peps, cli_args, journal),
+            total=len(peps),
+            desc=PEP_TQDM_MESSAGE
+        ):
+            peps_page_statuses = table_statuses[link]
+            if isinstance(pep_page_status, Exception):
+                exception_messages.append(
+                    GET_SOUP_MESSAGE.format(link, pep_page_status)
+                )
+                continue
+            record_item(session, link, pep_page_status)
+            expected_status = EXPECTED_STATUS.get(peps_page_statuses)
+            if expected_status is None:
+                exception_messages.append(
+                    UNKNOWN_STATUS_MESSAGE.format(link, peps_page_statuses)
+                )
+                continue
+            if pep_page_status not in expected_status:
+                info_messages.append(
+                    PEP_MESSAGE.format(link, pep_page_status, expected_status)
+                )
+            status_counter[pep_page_status] += 1
+            first_positions[pep_page_status] = min(
+                first_positions.get(pep_page_status, len(peps)),
+                positions[link]
             )
-        status_counter[pep_page_status] += 1
     list(map(logging.exception, exception_messages))
     list(map(logging.info, info_messages))
-    return [
-        PEP_RESULTS,
-        *status_counter.items(),
-        (TOTAL_PEP, sum(status_counter.values()))
-    ]
+    if exception_messages:
+        logging.warning(FAILED_ITEMS_MESSAGE.format(
+            len(exception_messages), total
+        ))
+    yield from sorted(
+        status_counter.items(), key=lambda item: first_positions[item[0]]
+    )
+    yield TOTAL_PEP, sum(status_counter.values())
+
+
+def pep(session, cli_args=None):
+    return list(iter_pep(session, cli_args))
 
 
 MODE_TO_FUNCTION = {
@@ -156,20 +493,200 @@ MODE_TO_FUNCTION = {
 }
 
 
+MODE_TO_ROWS = {
+    'whats-new': iter_whats_new,
+    'latest-versions': iter_latest_versions,
+    'pep': iter_pep,
+}
+
+
+@contextmanager
+def recording_history(session, args):
+    """С опцией --history записи режима копятся, пока он выдаёт строки,
+    и после успешного запуска сохраняются в историю запусков."""
+    if not getattr(args, 'history', False):
+        yield
+        return
+    if getattr(session, 'run_history', None) is None:
+        session.run_history = threading.local()
+    store = open_history(BASE_DIR / HISTORY_DB_NAME)
+    store.begin()
+    session.run_history.store = store
+    try:
+        yield
+        run, changed, removed = store.commit(args.mode)
+        logging.info(HISTORY_SAVED_MESSAGE.format(
+            run, args.mode, changed, removed
+        ))
+    finally:
+        session.run_history.store = None
+        store.close()
+
+
+def count_items(mode, rows):
+    """Число элементов результатов режима по выведенным строкам:
+    для pep — число PEP из строки «Итого», для остальных режимов —
+    число строк без заголовка."""
+    if mode == 'pep' and rows.last is not None and rows.last[0] == TOTAL_PEP:
+        return rows.last[1]
+    return max(rows.count - 1, 0)
+
+
+def stream_output(session, args, output_lock=None):
+    """Передаёт строки результатов режима в вывод по мере получения.
+    Время получения строк записывается в этап mode, остальное время
+    вывода — в этап output. С output_lock строки сначала собираются
+    целиком и выводятся под блокировкой, чтобы выводы режимов,
+    запущенных вместе, не перемешивались. Возвращает число элементов
+    результатов."""
+    rows = TimedIterator(MODE_TO_ROWS[args.mode](session, args))
+    start = time.perf_counter()
+    if output_lock is None:
+        control_output(rows, args)
+    else:
+        buffered = list(rows)
+        with output_lock:
+            control_output(iter(buffered), args)
+    if session.profiler is not None:
+        session.profiler.record(MODE_STAGE, rows.seconds)
+        session.profiler.record(
+            OUTPUT_STAGE, time.perf_counter() - start - rows.seconds
+        )
+    return count_items(args.mode, rows)
+
+
+def execute_mode(session, args, output_lock=None):
+    """Запускает режим и вывод его результатов. Возвращает число
+    элементов результатов или None для режима без результатов. Ошибка
+    режима учитывается в метриках запуска и передаётся дальше."""
+    try:
+        if args.mode not in MODE_TO_ROWS:
+            with measure(session, MODE_STAGE):
+                MODE_TO_FUNCTION[args.mode](session, args)
+            return None
+        with recording_history(session, args):
+            return stream_output(session, args, output_lock)
+    except Exception:
+        run_metrics = getattr(session, 'run_metrics', None)
+        if run_metrics is not None:
+            run_metrics.add('mode_errors')
+        raise
+
+
+@contextmanager
+def profiled(session, args):
+    """Замеряет запуск при включённом профилировании и выводит отчёт,
+    в том числе если режим завершился ошибкой."""
+    if session.profiler is not None:
+        session.profiler.start()
+    try:
+        yield
+    finally:
+        if session.profiler is not None:
+            session.profiler.stop()
+        if args.profile:
+            logging.info(PROFILE_MESSAGE.format(session.profiler.report()))
+        if args.profile_dump:
+            logging.info(PROFILE_DUMP_MESSAGE.format(args.profile_dump))
+
+
+def run_mode(session, args):
+    """Запускает режим и вывод результатов, замеряя их при включённом
+    профилировании. Возвращает словарь {режим: число элементов
+    результатов}, режим без результатов в него не входит."""
+    with profiled(session, args):
+        items = execute_mode(session, args)
+    return {} if items is None else {args.mode: items}
+
+
+def run_modes(session, args, modes):
+    """Запускает несколько режимов одновременно на одной сессии: у них
+    общие соединения, HTTP-кеш и кеш разбора. Ошибка одного режима
+    не прерывает остальные.
+    Возвращает словарь {режим: число элементов результатов} для
+    режимов с результатами, завершившихся без ошибки."""
+    output_lock = threading.Lock() if args.output in CONSOLE_OUTPUTS else None
+    items = {}
+    with profiled(session, args), ThreadPoolExecutor(len(modes)) as executor:
+        futures = {
+            mode: executor.submit(
+                execute_mode,
+                session,
+                Namespace(**{**vars(args), 'mode': mode}),
+                output_lock
+            )
+            for mode in modes
+        }
+        for mode, future in futures.items():
+            try:
+                count = future.result()
+            except Exception as error:
+                logging.exception(
+                    MODE_ERROR_MESSAGE.format(mode, error), stack_info=True
+                )
+                continue
+            if count is not None:
+                items[mode] = count
+    return items
+
+
+def close_session(session, args, items=None):
+    """Выводит в лог статистику запуска, при необходимости сохраняет
+    метрики и сокращает кеш, закрывает хранилища сессии."""
+    if args.metrics:
+        logging.info(METRICS_SAVED_MESSAGE.format(write_metrics(
+            args.metrics, collect_metrics(session, args.mode, items)
+        )))
+    logging.info(CACHE_STATS_MESSAGE.format(
+        session.cache_stats[CACHE_FRESH],
+        session.cache_stats[CACHE_REVALIDATED],
+        session.cache_stats[CACHE_REFETCHED]
+    ))
+    logging.info(EXTRACTION_STATS_MESSAGE.format(
+        session.extraction_cache.hits, session.extraction_cache.misses
+    ))
+    if session.rate_limiter is not None:
+        for host, rate in session.rate_limiter.rates().items():
+            logging.info(RATE_MESSAGE.format(host, rate))
+    if session.hedger is not None:
+        logging.info(HEDGE_MESSAGE.format(
+            session.hedger.sent, session.hedger.won, session.hedger.saved
+        ))
+        session.hedger.close()
+    close_process_pool(session)
+    if args.cache_max_size is not None:
+        logging.info(CACHE_EVICTED_MESSAGE.format(
+            session.cache_index.evict(
+                session.cache, int(args.cache_max_size * 2**20)
+            )
+        ))
+    session.cache_index.close()
+    session.extraction_cache.close()
+
+
 def main():
     configure_logging()
     logging.info(START_MESSAGE)
     try:
-        arg_parser = configure_argument_parser(MODE_TO_FUNCTION.keys())
+        arg_parser = configure_argument_parser(
+            [*MODE_TO_FUNCTION.keys(), ALL_MODES]
+        )
         args = arg_parser.parse_args()
         logging.info(ARGS_MESSAGE.format(args))
-        session = requests_cache.CachedSession()
-        if args.clear_cache:
-            session.cache.clear()
-        parser_mode = args.mode
-        results = MODE_TO_FUNCTION[parser_mode](session)
-        if results is not None:
-            control_output(results, args)
+        modes = (
+            list(MODE_TO_FUNCTION) if ALL_MODES in args.mode
+            else list(dict.fromkeys(args.mode))
+        )
+        args.mode = ','.join(modes)
+        session = configure_session(args)
+        items = None
+        try:
+            if len(modes) == 1:
+                items = run_mode(session, args)
+            else:
+                items = run_modes(session, args, modes)
+        finally:
+            close_session(session, args, items)
     except Exception as error:
         logging.exception(ERROR_MESSAGE.format(error), stack_info=True)
     logging.info(END_MESSAGE)
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+
+from constants import (CACHE_FRESH, CACHE_REFETCHED, CACHE_REVALIDATED,
+                       CACHE_STAGE, EXTRACT_STAGE, FETCH_STAGE,
+                       LATENCY_BUCKETS, PARSE_STAGE, PART_FILE_SUFFIX)
+
+PROMETHEUS_METRICS = (
+    ('requests_total', 'counter', 'Запросы страниц, включая ответы из кеша'),
+    ('downloaded_bytes_total', 'counter', 'Байт загружено из сети'),
+    ('parse_seconds_total', 'counter', 'Время разбора страниц, с'),
+    ('request_errors_total', 'counter', 'Запросы, завершившиеся ошибкой'),
+    ('item_errors_total', 'counter', 'Страницы, не обработанные и после '
+                                     'повторов'),
+    ('mode_errors_total', 'counter', 'Режимы, завершившиеся ошибкой'),
+    ('cache_hit_ratio', 'gauge', 'Доля ответов из кеша'),
+    ('last_run_timestamp_seconds', 'gauge', 'Время окончания запуска'),
+)
+
+
+class RunMetrics:
+    """Потокобезопасные счётчики запуска: байты, загруженные из сети,
+    ошибки запросов, обработки страниц и режимов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.downloaded_bytes = 0
+        self.request_errors = 0
+        self.item_errors = 0
+        self.mode_errors = 0
+
+    def add(self, name, value=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + value)
+
+
+def latency_histogram(latencies, buckets=LATENCY_BUCKETS):
+    """Накопительная гистограмма времени ответа в формате Prometheus."""
+    return {
+        'buckets': {
+            str(bound): sum(latency <= bound for latency in latencies)
+            for bound in buckets
+        },
+        'sum': sum(latencies),
+        'count': len(latencies),
+    }
+
+
+def collect_metrics(session, mode, items=None):
+    """Метрики запуска режима mode по счётчикам и замерам сессии.
+    items — словарь {режим: число элементов результатов}: для pep
+    это число PEP, для остальных режимов — строк результатов."""
+    timings = session.profiler.timings if session.profiler else {}
+    latencies = [
+        seconds
+        for stage in (FETCH_STAGE, CACHE_STAGE)
+        for seconds, _ in timings.get(stage, ())
+    ]
+    cache = {
+        state: session.cache_stats[state]
+        for state in (CACHE_FRESH, CACHE_REVALIDATED, CACHE_REFETCHED)
+    }
+    requests_total = sum(cache.values())
+    return {
+        'mode': mode,
+        'requests_total': requests_total,
+        'latency_seconds': latency_histogram(latencies),
+        'cache_responses': cache,
+        'cache_hit_ratio': (
+            (cache[CACHE_FRESH] + cache[CACHE_REVALIDATED]) / requests_total
+            if requests_total else 0
+        ),
+        'downloaded_bytes_total': session.run_metrics.downloaded_bytes,
+        'parse_seconds_total': sum(
+            seconds
+            for stage in (PARSE_STAGE, EXTRACT_STAGE)
+            for seconds, _ in timings.get(stage, ())
+        ),
+        'items': dict(items or {}),
+        'request_errors_total': session.run_metrics.request_errors,
+        'item_errors_total': session.run_metrics.item_errors,
+        'mode_errors_total': session.run_metrics.mode_errors,
+        'last_run_timestamp_seconds': time.time(),
+    }
+
+
+def format_prometheus(metrics):
+    """Метрики в текстовом формате Prometheus (textfile collector)."""
+    labels = f'mode="{metrics["mode"]}"'
+    lines = []
+    for name, metric_type, description in PROMETHEUS_METRICS:
+        lines += [
+            f'# HELP parser_{name} {description}',
+            f'# TYPE parser_{name} {metric_type}',
+            f'parser_{name}{{{labels}}} {metrics[name]}',
+        ]
+    lines += [
+        '# HELP parser_cache_responses_total Ответы по состоянию в кеше',
+        '# TYPE parser_cache_responses_total counter',
+    ]
+    lines += [
+        f'parser_cache_responses_total{{{labels},state="{state}"}} {count}'
+        for state, count in metrics['cache_responses'].items()
+    ]
+    lines += [
+        '# HELP parser_items Элементов в результатах режима: PEP для pep, '
+        'строк для остальных режимов',
+        '# TYPE parser_items gauge',
+    ]
+    lines += [
+        f'parser_items{{mode="{mode}"}} {count}'
+        for mode, count in metrics['items'].items()
+    ]
+    histogram = metrics['latency_seconds']
+    lines += [
+        '# HELP parser_latency_seconds Время ответа на запрос страницы, с',
+        '# TYPE parser_latency_seconds histogram',
+    ]
+    lines += [
+        f'parser_latency_seconds_bucket{{{labels},le="{bound}"}} {count}'
+        for bound, count in histogram['buckets'].items()
+    ]
+    lines += [
+        f'parser_latency_seconds_bucket{{{labels},le="+Inf"}} '
+        f'{histogram["count"]}',
+        f'parser_latency_seconds_sum{{{labels}}} {histogram["sum"]}',
+        f'parser_latency_seconds_count{{{labels}}} {histogram["count"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def format_json(metrics):
+    return json.dumps(metrics, ensure_ascii=False, indent=2)
+
+
+METRICS_FORMATS = {
+    '.prom': format_prometheus,
+    '.json': format_json,
+}
+
+
+def write_metrics(path, metrics):
+    """Атомарно записывает метрики: в формате Prometheus для файла
+    .prom, иначе в JSON."""
+    temp_path = path + PART_FILE_SUFFIX
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(METRICS_FORMATS.get(
+            os.path.splitext(path)[1], format_json
+        )(metrics))
+    os.replace(temp_path, path)
+    return path
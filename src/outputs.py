@@ -1,43 +1,145 @@
 import csv
 import datetime as dt
+import json
 import logging
+import sqlite3
+from itertools import islice
 
 from prettytable import PrettyTable
 
-from constants import (BASE_DIR, DATETIME_FORMAT, FILE_OUTPUT, PRETTY_OUTPUT,
-                       RESULTS_DIR_NAME)
+from constants import (BASE_DIR, DATETIME_FORMAT, FILE_OUTPUT, JSONL_OUTPUT,
+                       OUTPUT_BATCH_SIZE, PRETTY_OUTPUT, RESULTS_DB_NAME,
+                       RESULTS_DIR_NAME, SQLITE_OUTPUT, SQLITE_TIMEOUT)
 
 FILE_SAVED_MESSAGE = 'Файл с результатами был сохранён: {}'
+DB_SAVED_MESSAGE = 'Строк результатов добавлено в {}: {} (запуск {})'
+CREATE_RESULTS_SQL = (
+    'CREATE TABLE IF NOT EXISTS results '
+    '(mode TEXT NOT NULL, started TEXT NOT NULL, position INTEGER NOT NULL, '
+    'record TEXT NOT NULL, PRIMARY KEY (mode, started, position))'
+)
+CREATE_PENDING_RESULTS_SQL = (
+    'CREATE TEMP TABLE pending_results '
+    '(position INTEGER NOT NULL, record TEXT NOT NULL)'
+)
+CREATE_RESULTS_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS results_started ON results (started)'
+)
+
+
+def results_path(cli_args, extension):
+    """Путь к файлу результатов режима с временем запуска в имени."""
+    results_dir = BASE_DIR / RESULTS_DIR_NAME
+    results_dir.mkdir(exist_ok=True)
+    return (
+        results_dir /
+        f'{cli_args.mode}_{dt.datetime.now().strftime(DATETIME_FORMAT)}'
+        f'.{extension}'
+    )
+
+
+def row_to_record(header, row):
+    return json.dumps(dict(zip(header, row)), ensure_ascii=False)
+
+
+def batched(rows, size=OUTPUT_BATCH_SIZE):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
 
 
 def pretty_output(results, *args):
+    """Таблица выравнивается по самым широким значениям,
+    поэтому выводится после получения всех строк."""
+    rows = iter(results)
     table = PrettyTable()
-    table.field_names = results[0]
+    table.field_names = next(rows)
     table.align = 'l'
-    table.add_rows(results[1:])
+    table.add_rows(rows)
     print(table)
 
 
 def file_output(results, *args):
-    results_dir = BASE_DIR / RESULTS_DIR_NAME
-    results_dir.mkdir(exist_ok=True)
-    file_path = (
-        results_dir /
-        f'{args[0].mode}_{dt.datetime.now().strftime(DATETIME_FORMAT)}.csv'
-    )
+    """Строки дописываются в CSV-файл по мере получения. Файл создаётся,
+    когда получен заголовок."""
+    rows = iter(results)
+    header = next(rows)
+    file_path = results_path(args[0], 'csv')
     with open(file_path, 'w', encoding='utf-8') as file:
-        csv.writer(file, dialect=csv.unix_dialect).writerows(results)
+        writer = csv.writer(file, dialect=csv.unix_dialect)
+        writer.writerow(header)
+        writer.writerows(rows)
     logging.info(FILE_SAVED_MESSAGE.format(file_path))
 
 
+def jsonl_output(results, *args):
+    """Строки в файл JSON Lines по мере получения: по объекту
+    с ключами из заголовка на строку."""
+    rows = iter(results)
+    header = next(rows)
+    file_path = results_path(args[0], 'jsonl')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write(row_to_record(header, row) + '\n')
+    logging.info(FILE_SAVED_MESSAGE.format(file_path))
+
+
+def sqlite_output(results, *args):
+    """Строки в таблицу results базы results.sqlite с ключом из режима,
+    времени запуска и номера строки. Пока режим выдаёт строки, они
+    пакетами по OUTPUT_BATCH_SIZE копятся во временной таблице и затем
+    переносятся одной транзакцией: запуск сохраняется целиком или не
+    сохраняется вовсе, а база не блокируется на время обхода."""
+    rows = iter(results)
+    header = next(rows)
+    results_dir = BASE_DIR / RESULTS_DIR_NAME
+    results_dir.mkdir(exist_ok=True)
+    db_path = results_dir / RESULTS_DB_NAME
+    mode = args[0].mode
+    started = dt.datetime.now().isoformat(timespec='microseconds')
+    connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT)
+    try:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA temp_store=MEMORY')
+        connection.execute(CREATE_RESULTS_SQL)
+        connection.execute(CREATE_RESULTS_INDEX_SQL)
+        connection.execute(CREATE_PENDING_RESULTS_SQL)
+        count = 0
+        with connection:
+            for batch in batched(rows):
+                connection.executemany(
+                    'INSERT INTO pending_results VALUES (?, ?)',
+                    [
+                        (position, row_to_record(header, row))
+                        for position, row in enumerate(batch, count)
+                    ]
+                )
+                count += len(batch)
+            connection.execute(
+                'INSERT INTO results '
+                'SELECT ?, ?, position, record FROM pending_results',
+                (mode, started)
+            )
+    finally:
+        connection.close()
+    logging.info(DB_SAVED_MESSAGE.format(db_path, count, started))
+
+
 def default_output(results, *args):
     for row in results:
         print(*row)
 
 
+# Выводы в консоль: при запуске нескольких режимов их строки
+# не должны перемешиваться.
+CONSOLE_OUTPUTS = (PRETTY_OUTPUT, None)
 OUTPUT_TO_FUNCTIONS = {
     PRETTY_OUTPUT: pretty_output,
     FILE_OUTPUT: file_output,
+    JSONL_OUTPUT: jsonl_output,
+    SQLITE_OUTPUT: sqlite_output,
     None: default_output
 }
 
@@ -0,0 +1,146 @@
+import cProfile
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from prettytable import PrettyTable
+
+from constants import PROFILE_SLOWEST
+
+PROFILE_STAGES_FIELDS = ('Этап', 'Замеров', 'p50, с', 'p95, с', 'max, с')
+PROFILE_SLOWEST_FIELDS = ('URL', 'Этап', 'Время, с')
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def timed_call(function, *args):
+    """Результат вызова и его длительность. Функция уровня модуля,
+    чтобы её можно было передать в пул процессов."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+class TimedIterator:
+    """Итератор, считающий полученные элементы и суммарное время
+    их получения. Последний полученный элемент хранится в last."""
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.seconds = 0
+        self.count = 0
+        self.last = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.count += 1
+        self.last = item
+        return item
+
+
+class Profiler:
+    """Замеры длительности этапов работы парсера по URL.
+    С dump_path весь запуск дополнительно профилируется cProfile:
+    поток, вызвавший start, и каждый поток, запущенный после него,
+    получают свой профиль, при остановке профили объединяются.
+    Процессы движка process не профилируются."""
+
+    def __init__(self, dump_path=None):
+        self.timings = defaultdict(list)
+        self.lock = threading.Lock()
+        self.dump_path = dump_path
+        self.profile = cProfile.Profile() if dump_path else None
+        self.thread_profiles = []
+
+    def record(self, stage, seconds, url=None):
+        with self.lock:
+            self.timings[stage].append((seconds, url))
+
+    @contextmanager
+    def measure(self, stage, url=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, url)
+
+    def start(self):
+        if self.profile is not None:
+            threading.setprofile(self.profile_thread)
+            self.profile.enable()
+
+    def profile_thread(self, *args):
+        """Первое событие нового потока: cProfile.enable профилирует
+        только вызывающий поток, поэтому каждому потоку нужен свой
+        профиль."""
+        profile = cProfile.Profile()
+        with self.lock:
+            self.thread_profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        """Останавливает cProfile и сохраняет статистику всех потоков
+        в dump_path."""
+        if self.profile is not None:
+            threading.setprofile(None)
+            self.profile.disable()
+            stats = pstats.Stats(self.profile)
+            with self.lock:
+                thread_profiles, self.thread_profiles = (
+                    self.thread_profiles, []
+                )
+            for profile in thread_profiles:
+                profile.create_stats()
+                if profile.stats:
+                    stats.add(profile)
+            stats.dump_stats(self.dump_path)
+
+    def report(self, slowest=PROFILE_SLOWEST):
+        """Таблица p50/p95/max по этапам и таблица самых долгих URL."""
+        stages = PrettyTable(PROFILE_STAGES_FIELDS)
+        stages.align = 'l'
+        with self.lock:
+            timings = {
+                stage: list(rows) for stage, rows in self.timings.items()
+            }
+        for stage, rows in timings.items():
+            seconds = [row[0] for row in rows]
+            stages.add_row((
+                stage,
+                len(seconds),
+                f'{percentile(seconds, 50):.4f}',
+                f'{percentile(seconds, 95):.4f}',
+                f'{max(seconds):.4f}'
+            ))
+        urls = PrettyTable(PROFILE_SLOWEST_FIELDS)
+        urls.align = 'l'
+        for seconds, stage, url in sorted(
+            (
+                (seconds, stage, url)
+                for stage, rows in timings.items()
+                for seconds, url in rows if url is not None
+            ),
+            reverse=True
+        )[:slowest]:
+            urls.add_row((url, stage, f'{seconds:.4f}'))
+        return f'{stages}\n{urls}'
+
+
+def measure(session, stage, url=None):
+    """Замер этапа профилировщиком сессии, если профилирование включено."""
+    profiler = getattr(session, 'profiler', None)
+    if profiler is None:
+        return nullcontext()
+    return profiler.measure(stage, url)
@@ -0,0 +1,81 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from constants import THROTTLE_STATUSES
+
+
+class TokenBucket:
+    """Корзина токенов одного хоста с изменяемой скоростью rate
+    (запросов в секунду). Запас токенов не больше burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Берёт токен, при необходимости выжидая его появления."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        time.sleep(delay)
+
+
+class AdaptiveRateLimiter:
+    """Ограничение частоты запросов к каждому хосту, подстраивающееся
+    под сервер: при ответах 429/503 и ошибках соединения скорость
+    уменьшается вдвое, при ответах медленнее target_latency — на десятую
+    часть, а при быстрых ответах растёт на increase запросов в секунду."""
+
+    def __init__(
+        self, rate, min_rate, max_rate, target_latency, increase=1,
+        decrease=0.5, slowdown=0.9
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.slowdown = slowdown
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.rate)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+    def observe(self, url, latency, statuses=()):
+        """Подстраивает скорость хоста по ответу: statuses — коды ответа
+        вместе с кодами повторённых транспортом попыток, пустой кортеж
+        означает ошибку соединения."""
+        bucket = self.bucket(url)
+        with bucket.lock:
+            if not statuses or THROTTLE_STATUSES.intersection(statuses):
+                bucket.rate *= self.decrease
+                bucket.tokens = min(bucket.tokens, 0)
+            elif latency > self.target_latency:
+                bucket.rate *= self.slowdown
+            else:
+                bucket.rate += self.increase
+            bucket.rate = min(self.max_rate, max(self.min_rate, bucket.rate))
+            bucket.burst = max(1, bucket.rate)
+
+    def rates(self):
+        """Текущая скорость по хостам, запросов в секунду."""
+        with self.lock:
+            return {host: bucket.rate for host, bucket in self.buckets.items()}
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+from constants import (FINAL_PEP_EXPIRE_AFTER, FINAL_TABLE_STATUS,
+                       NEVER_EXPIRE, PART_FILE_SUFFIX, SNAPSHOT_EXPIRE_AFTER)
+
+
+def read_snapshot(path):
+    """Снимок прошлого запуска: {ссылка на PEP: запись о проверке}."""
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_snapshot(path, snapshot):
+    """Атомарно записывает снимок."""
+    temp_path = path.with_name(path.name + PART_FILE_SUFFIX)
+    temp_path.write_text(
+        json.dumps(snapshot, ensure_ascii=False, indent=2), encoding='utf-8'
+    )
+    os.replace(temp_path, path)
+
+
+def make_entry(table_status, page_status, checked=None):
+    """Запись снимка о проверке одного PEP."""
+    return {
+        'table_status': table_status,
+        'page_status': page_status,
+        'checked': time.time() if checked is None else checked,
+    }
+
+
+def is_expired(entry, now=None):
+    """Запись устарела, если её срок истёк. Записи PEP в статусе Final
+    хранятся по сроку FINAL_PEP_EXPIRE_AFTER."""
+    expire_after = (
+        FINAL_PEP_EXPIRE_AFTER
+        if entry['table_status'] == FINAL_TABLE_STATUS
+        else SNAPSHOT_EXPIRE_AFTER
+    )
+    if expire_after == NEVER_EXPIRE:
+        return False
+    return (time.time() if now is None else now) - entry['checked'] \
+        >= expire_after
+
+
+def diff_snapshot(snapshot, peps, now=None):
+    """Разделяет строки таблицы PEP 0 на новые PEP, PEP с изменившейся
+    строкой и PEP с устаревшей записью. Возвращает эти три списка
+    и ссылки на PEP, которых больше нет в таблице."""
+    new, changed, expired = [], [], []
+    for link, table_status in peps:
+        entry = snapshot.get(link)
+        if entry is None:
+            new.append((link, table_status))
+        elif entry['table_status'] != table_status:
+            changed.append((link, table_status))
+        elif is_expired(entry, now):
+            expired.append((link, table_status))
+    links = {link for link, _ in peps}
+    removed = [link for link in snapshot if link not in links]
+    return new, changed, expired, removed
@@ -0,0 +1,166 @@
+import json
+import time
+from functools import partial
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from constants import (DEFAULT_WORKERS, RETRY_METHODS, RETRY_STATUSES,
+                       TRANSPORT_SETTINGS)
+from hedging import Hedger
+from ratelimit import AdaptiveRateLimiter
+
+
+def response_statuses(response):
+    """Код ответа и коды попыток, повторённых urllib3."""
+    retries = getattr(response.raw, 'retries', None)
+    history = retries.history if retries is not None else ()
+    return (
+        *(entry.status for entry in history if entry.status is not None),
+        response.status_code
+    )
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """Адаптер с таймаутами подключения и чтения по умолчанию
+    для запросов, в которых таймаут не указан. С ограничителем
+    limiter каждый запрос к серверу ждёт токена своего хоста, а время
+    и коды ответа подстраивают скорость. Повторы по кодам ответа тогда
+    выполняет сам адаптер, а не urllib3, чтобы каждая попытка тоже ждала
+    токена и сообщала ограничителю свой код. Ответы из кеша через адаптер
+    не проходят и не ограничиваются. С hedger медленные GET-запросы
+    без потоковой загрузки дублируются, дубли тоже ждут токена."""
+
+    def __init__(
+        self, timeout=None, limiter=None, hedger=None, max_retries=0,
+        **kwargs
+    ):
+        self.timeout = timeout
+        self.limiter = limiter
+        self.hedger = hedger
+        self.status_retries = None
+        if limiter is not None and isinstance(max_retries, Retry):
+            self.status_retries = max_retries
+            max_retries = max_retries.new(
+                status_forcelist=(), respect_retry_after_header=False
+            )
+        super().__init__(max_retries=max_retries, **kwargs)
+
+    def send(self, request, timeout=None, stream=False, **kwargs):
+        send = partial(
+            self.send_limited,
+            request,
+            timeout=self.timeout if timeout is None else timeout,
+            stream=stream,
+            **kwargs
+        )
+        if self.hedger is None or stream or request.method != 'GET':
+            return send()
+        return self.hedger.send(send)
+
+    def send_limited(self, request, timeout=None, **kwargs):
+        if self.limiter is None:
+            return super().send(request, timeout=timeout, **kwargs)
+        retries = self.status_retries
+        while True:
+            response = self.send_observed(request, timeout=timeout, **kwargs)
+            if retries is None or not retries.is_retry(
+                request.method,
+                response.status_code,
+                'Retry-After' in response.headers
+            ):
+                return response
+            try:
+                retries = retries.increment(
+                    request.method, request.url, response=response.raw
+                )
+            except MaxRetryError:
+                return response
+            retries.sleep(response.raw)
+            response.close()
+
+    def send_observed(self, request, **kwargs):
+        """Одна попытка запроса: ждёт токена хоста и сообщает
+        ограничителю время и коды ответа."""
+        self.limiter.acquire(request.url)
+        start = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            self.limiter.observe(request.url, time.monotonic() - start)
+            raise
+        self.limiter.observe(
+            request.url,
+            time.monotonic() - start,
+            response_statuses(response)
+        )
+        return response
+
+
+def load_transport_settings(cli_args=None):
+    """Настройки пула соединений и повторов: значения по умолчанию,
+    затем JSON-файл --transport-config, затем опции командной строки.
+    Размер пула по умолчанию не меньше числа потоков загрузки."""
+    settings = dict(TRANSPORT_SETTINGS)
+    settings['pool_size'] = max(
+        settings['pool_size'], getattr(cli_args, 'workers', DEFAULT_WORKERS)
+    )
+    path = getattr(cli_args, 'transport_config', None)
+    if path is not None:
+        with open(path, encoding='utf-8') as file:
+            settings.update(json.load(file))
+    for name in TRANSPORT_SETTINGS:
+        value = getattr(cli_args, name, None)
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+def make_limiter(settings):
+    """Подстраивающийся ограничитель частоты запросов или None,
+    если начальная скорость rate равна нулю."""
+    if not settings['rate']:
+        return None
+    return AdaptiveRateLimiter(
+        settings['rate'],
+        settings['min_rate'],
+        max(settings['max_rate'], settings['rate']),
+        settings['target_latency']
+    )
+
+
+def make_adapter(settings):
+    """Адаптер с пулом соединений на хост, ограничением частоты запросов
+    и повторами urllib3 с экспоненциальной паузой для ответов 429 и 5xx.
+    Пауза из заголовка Retry-After имеет приоритет."""
+    return TimeoutHTTPAdapter(
+        timeout=(settings['connect_timeout'], settings['read_timeout']),
+        limiter=make_limiter(settings),
+        hedger=Hedger(2 * settings['pool_size']) if settings['hedge']
+        else None,
+        pool_connections=settings['pool_size'],
+        pool_maxsize=settings['pool_size'],
+        max_retries=Retry(
+            total=settings['http_retries'],
+            backoff_factor=settings['backoff_factor'],
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+
+
+def configure_transport(session, cli_args=None):
+    """Подключает к сессии адаптер с настройками пула, повторов
+    и ограничения частоты запросов."""
+    settings = load_transport_settings(cli_args)
+    adapter = make_adapter(settings)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.rate_limiter = adapter.limiter
+    session.hedger = adapter.hedger
+    if not settings['keep_alive']:
+        session.headers['Connection'] = 'close'
+    return session
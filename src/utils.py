@@ -1,7 +1,14 @@
+import threading
+import time
+from collections import Counter
+
 import requests
 from bs4 import BeautifulSoup
 
+from constants import (CACHE_FRESH, CACHE_REFETCHED, CACHE_REVALIDATED,
+                       CACHE_STAGE, FETCH_STAGE, PARSE_STAGE)
 from exceptions import ParserFindTagException
+from profiling import measure
 
 GET_RESPONSE_MESSAGE = 'Возникла ошибка при загрузке страницы {} {}'
 FIND_TAG_MESSAGE = 'Не найден тег {} {}'
@@ -9,13 +16,60 @@ ADD_FIND_TAG_MESSAGE = ' cо строкой \'{}\''
 FIND_NEXT_SIBLING_MESSAGE = 'После тега {} нет тега {}'
 
 
-def get_response(session, url, encoding='utf-8'):
+class CacheStats(Counter):
+    """Потокобезопасный счётчик ответов по состоянию в кеше:
+    свежие из кеша, подтверждённые сервером (304) и загруженные заново."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def count(self, response):
+        with self.lock:
+            self[cache_state(response)] += 1
+
+
+def cache_state(response):
+    """Состояние ответа в кеше: свежий из кеша, подтверждённый
+    сервером или загруженный заново."""
+    if not getattr(response, 'from_cache', False):
+        return CACHE_REFETCHED
+    if getattr(response, 'revalidated', False):
+        return CACHE_REVALIDATED
+    return CACHE_FRESH
+
+
+def get_response(session, url, encoding='utf-8', **kwargs):
     """Перехват ошибки RequestException."""
+    start = time.perf_counter()
     try:
-        response = session.get(url)
+        response = session.get(url, **kwargs)
         response.encoding = encoding
+        profiler = getattr(session, 'profiler', None)
+        if profiler is not None:
+            profiler.record(
+                CACHE_STAGE if cache_state(response) == CACHE_FRESH
+                else FETCH_STAGE,
+                time.perf_counter() - start,
+                url
+            )
+        run_metrics = getattr(session, 'run_metrics', None)
+        if (
+            run_metrics is not None and not kwargs.get('stream')
+            and not getattr(response, 'from_cache', False)
+        ):
+            run_metrics.add('downloaded_bytes', len(response.content))
+        cache_stats = getattr(session, 'cache_stats', None)
+        if cache_stats is not None:
+            cache_stats.count(response)
+        cache_index = getattr(session, 'cache_index', None)
+        if cache_index is not None and getattr(response, 'cache_key', None):
+            cache_index.touch(response.cache_key)
         return response
     except requests.RequestException as error:
+        run_metrics = getattr(session, 'run_metrics', None)
+        if run_metrics is not None:
+            run_metrics.add('request_errors')
         raise ConnectionError(
             GET_RESPONSE_MESSAGE.format(url, error))
 
@@ -39,6 +93,18 @@ def find_tag(soup, tag, attrs=None, string=''):
     )
 
 
+def find_tag_by_text(soup, tag, text):
+    """Поиск тега по полному тексту, включая вложенные теги.
+    Бросает исключение, если не найден."""
+    return handle_tag_result(
+        next(
+            (found for found in soup.find_all(tag) if found.text == text),
+            None
+        ),
+        FIND_TAG_MESSAGE.format(tag, None) + ADD_FIND_TAG_MESSAGE.format(text)
+    )
+
+
 def find_next_sibling_tag(tag, sibling_tag):
     """Поиск следующего тега с использованием find_next_sibling.
     Бросает исключение, если не найден."""
@@ -48,6 +114,15 @@ def find_next_sibling_tag(tag, sibling_tag):
     )
 
 
-def get_soup(session, url, features='lxml'):
-    """Возвращает объект BeautifulSoup для переданного URL"""
-    return BeautifulSoup(get_response(session, url).text, features=features)
+def get_soup(session, url, features='lxml', parse_only=None, **kwargs):
+    """Возвращает объект BeautifulSoup для переданного URL.
+    Байты ответа передаются парсеру без декодирования в текст,
+    parse_only (SoupStrainer) ограничивает разбор нужными тегами."""
+    response = get_response(session, url, **kwargs)
+    with measure(session, PARSE_STAGE, url):
+        return BeautifulSoup(
+            response.content,
+            features=features,
+            parse_only=parse_only,
+            from_encoding=response.encoding
+        )
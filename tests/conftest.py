@@ -1,5 +1,8 @@
 import sys
+import threading
+import time
 from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import List, Tuple
 
@@ -110,3 +113,82 @@ def records():
         result = results[mode]
         return converting(result)
     return _records
+
+
+@pytest.fixture
+def site_session(mock_session):
+    """Сессия, отдающая страницы PEP и «Что нового» из fixture_data."""
+    from src.constants import MAIN_DOC_URL, PEPS_URL
+    from tests.fixture_data import pages
+    whats_new_url = MAIN_DOC_URL + 'whatsnew/'
+    with requests_mock.Mocker() as mock:
+        mock.get(PEPS_URL, text=pages.pep_zero_page())
+        mock.get(PEPS_URL + 'api/peps.json', text=pages.peps_json())
+        for path, page in pages.pep_pages().items():
+            mock.get(PEPS_URL + path, text=page)
+        mock.get(whats_new_url, text=pages.whats_new_index_page())
+        for path, page in pages.whats_new_pages().items():
+            mock.get(whats_new_url + path, text=page)
+        mock.get(MAIN_DOC_URL + 'download.html', text=pages.download_page())
+        for path, content in pages.archives().items():
+            mock.get(MAIN_DOC_URL + path, content=content)
+        mock_session.site_mock = mock
+        yield mock_session
+
+
+def make_site_handler(pages, delays):
+    class SiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delays.get(self.path, 0))
+            page = pages.get(self.path)
+            if page is None:
+                self.send_error(404)
+                return
+            body = page.encode('utf-8')
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except ConnectionError:
+                # Клиент не дождался ответа: трассировка из потока
+                # сервера в середине другого теста не нужна.
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+@pytest.fixture
+def local_site(monkeypatch):
+    """Локальный HTTP-сервер со страницами PEP и «Что нового».
+    Подменяет MAIN_DOC_URL и PEPS_URL в модуле main."""
+    from src import main
+    from tests.fixture_data import pages
+    site = {
+        '/peps/': pages.pep_zero_page(),
+        '/peps/api/peps.json': pages.peps_json(),
+    }
+    site.update({
+        '/peps/' + path: page for path, page in pages.pep_pages().items()
+    })
+    site['/3/whatsnew/'] = pages.whats_new_index_page()
+    site.update({
+        '/3/whatsnew/' + path: page
+        for path, page in pages.whats_new_pages().items()
+    })
+    delays = {}
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', 0), make_site_handler(site, delays)
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    monkeypatch.setattr(main, 'MAIN_DOC_URL', base_url + '/3/')
+    monkeypatch.setattr(main, 'PEPS_URL', base_url + '/peps/')
+    yield Namespace(base_url=base_url, pages=site, delays=delays)
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,152 @@
+import json
+
+PEP_ZERO_ROW = (
+    '<tr class="row-odd">'
+    '<td><abbr title="{type_title}">{pep_type}{status}</abbr></td>'
+    '<td><a class="pep reference internal" href="pep-{number:04d}/" '
+    'title="PEP {number}">{number}</a></td>'
+    '<td><a class="pep reference internal" href="pep-{number:04d}/">'
+    'Title of PEP {number}</a></td>'
+    '<td>Author</td>'
+    '</tr>'
+)
+PEP_ZERO_PAGE = (
+    '<html><body><section id="numerical-index">'
+    '<table class="pep-zero-table docutils align-default">'
+    '<thead><tr class="row-odd"><th>Type</th><th>PEP</th>'
+    '<th>Title</th><th>Authors</th></tr></thead>'
+    '<tbody>{rows}</tbody></table></section></body></html>'
+)
+PEP_PAGE = (
+    '<html><body><section id="pep-content">'
+    '<h1 class="page-title">PEP {number} – Title of PEP {number}</h1>'
+    '<dl class="rfc2822 field-list simple">'
+    '<dt class="field-odd">Author<span class="colon">:</span></dt>'
+    '<dd class="field-odd">Author</dd>'
+    '<dt class="field-even">Status<span class="colon">:</span></dt>'
+    '<dd class="field-even"><abbr title="{status}">{status}</abbr></dd>'
+    '<dt class="field-odd">Type<span class="colon">:</span></dt>'
+    '<dd class="field-odd"><abbr title="Standards Track">'
+    'Standards Track</abbr></dd>'
+    '</dl></section></body></html>'
+)
+PEPS = (
+    (1, 'P', 'A', 'Active'),
+    (8, 'P', 'A', 'Active'),
+    (20, 'I', 'A', 'Active'),
+    (100, 'S', 'F', 'Final'),
+    (201, 'S', 'F', 'Final'),
+    (202, 'S', 'R', 'Rejected'),
+    (249, 'S', 'F', 'Final'),
+    (401, 'P', 'F', 'April Fool!'),
+    (554, 'S', 'S', 'Superseded'),
+    (638, 'S', '', 'Draft'),
+    (703, 'S', 'A', 'Accepted'),
+    (3000, 'P', 'W', 'Withdrawn'),
+)
+
+WHATS_NEW_INDEX_PAGE = (
+    '<html><body><section id="what-s-new-in-python">'
+    '<h1>What’s New in Python</h1>'
+    '<div class="toctree-wrapper compound"><ul>{items}</ul></div>'
+    '</section></body></html>'
+)
+WHATS_NEW_ITEM = (
+    '<li class="toctree-l1"><a class="reference internal" '
+    'href="{version}.html">What’s New In Python {version}</a></li>'
+)
+WHATS_NEW_PAGE = (
+    '<html><body><section id="what-s-new-in-python-{slug}">'
+    '<h1>What’s New In Python {version}<a class="headerlink" '
+    'href="#what-s-new-in-python-{slug}">¶</a></h1>'
+    '<dl class="field-list simple">'
+    '<dt class="field-odd">Editor<span class="colon">:</span></dt>'
+    '<dd class="field-odd"><p>Editor of {version}</p>\n</dd>'
+    '</dl></section></body></html>'
+)
+WHATS_NEW_VERSIONS = ('3.13', '3.12', '3.11', '3.10', '3.9', '2.7')
+
+
+def pep_zero_page(peps=PEPS):
+    return PEP_ZERO_PAGE.format(rows=''.join(
+        PEP_ZERO_ROW.format(
+            type_title='Type', pep_type=pep_type,
+            status=status, number=number
+        )
+        for number, pep_type, status, _ in peps
+    ))
+
+
+def pep_pages(peps=PEPS):
+    return {
+        f'pep-{number:04d}/': PEP_PAGE.format(number=number, status=status)
+        for number, _, _, status in peps
+    }
+
+
+def peps_json(peps=PEPS):
+    return json.dumps({
+        str(number): {
+            'number': number,
+            'title': f'Title of PEP {number}',
+            'status': status,
+            'url': f'https://peps.python.org/pep-{number:04d}/',
+        }
+        for number, _, _, status in peps
+    })
+
+
+def whats_new_index_page(versions=WHATS_NEW_VERSIONS):
+    return WHATS_NEW_INDEX_PAGE.format(items=''.join(
+        WHATS_NEW_ITEM.format(version=version) for version in versions
+    ))
+
+
+def whats_new_pages(versions=WHATS_NEW_VERSIONS):
+    return {
+        f'{version}.html': WHATS_NEW_PAGE.format(
+            version=version, slug=version.replace('.', '-')
+        )
+        for version in versions
+    }
+
+DOWNLOAD_PAGE = (
+    '<html><body><section id="download-python-documentation">'
+    '<table class="docutils align-default"><tbody>{rows}</tbody></table>'
+    '</section></body></html>'
+)
+DOWNLOAD_ROW = (
+    '<tr><td>{title}</td><td><a class="reference external" '
+    'href="archives/python-3.13-docs-{name}.zip">Download</a></td>'
+    '<td><a class="reference external" '
+    'href="archives/python-3.13-docs-{name}.tar.bz2">Download</a></td></tr>'
+)
+DOWNLOAD_FORMATS = (
+    ('PDF (US-Letter paper size)', 'pdf-letter'),
+    ('PDF (A4 paper size)', 'pdf-a4'),
+    ('HTML', 'html'),
+    ('Plain text', 'text'),
+)
+EPUB_ROW = (
+    '<tr><td>EPUB</td><td><a class="reference external" '
+    'href="archives/python-3.13-docs.epub">Download</a></td><td></td></tr>'
+)
+
+
+def download_page():
+    return DOWNLOAD_PAGE.format(rows=''.join(
+        DOWNLOAD_ROW.format(title=title, name=name)
+        for title, name in DOWNLOAD_FORMATS
+    ) + EPUB_ROW)
+
+
+def archives():
+    names = [
+        f'python-3.13-docs-{name}.{extension}'
+        for _, name in DOWNLOAD_FORMATS
+        for extension in ('zip', 'tar.bz2')
+    ]
+    names.append('python-3.13-docs.epub')
+    return {
+        f'archives/{name}': name.encode('utf-8') * 100 for name in names
+    }
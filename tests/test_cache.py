@@ -0,0 +1,135 @@
+import sqlite3
+from argparse import Namespace
+
+import pytest
+import requests_mock
+from conftest import MAIN_DOC_URL
+
+try:
+    from src import cache, configs, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache.py`'
+
+PAGES = [MAIN_DOC_URL + f'page-{number}.html' for number in range(3)]
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'filesystem', 'memory'])
+def test_cache_backends(monkeypatch, tmp_path, backend):
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(cache_backend=backend))
+    with requests_mock.Mocker() as mock:
+        mock.get(PAGES[0], text='Python ' * 1000)
+        utils.get_response(session, PAGES[0])
+        got = utils.get_response(session, PAGES[0])
+        assert mock.call_count == 1
+    assert got.from_cache, f'Хранилище {backend} должно отдавать страницы'
+    assert got.text == 'Python ' * 1000
+    session.cache_index.close()
+
+
+def test_compressed_serializer(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(cache_backend='sqlite'))
+    with requests_mock.Mocker() as mock:
+        mock.get(PAGES[0], text='Python ' * 1000)
+        utils.get_response(session, PAGES[0])
+    stored = sqlite3.connect(str(tmp_path / 'http_cache.sqlite')).execute(
+        'SELECT value FROM responses'
+    ).fetchone()[0]
+    assert len(stored) < 1000, 'Тела ответов должны храниться сжатыми'
+    session.cache_index.close()
+
+
+def test_cache_index_evicts_least_recently_used(mock_session):
+    mock_session.cache_index = cache.CacheIndex(':memory:')
+    with requests_mock.Mocker() as mock:
+        for url in PAGES:
+            mock.get(url, text='x' * 1000)
+        keys = [
+            utils.get_response(mock_session, url).cache_key
+            for url in (PAGES[0], PAGES[1], PAGES[2], PAGES[0])
+        ]
+    evicted = mock_session.cache_index.evict(mock_session.cache, 2500)
+    assert evicted == 1
+    assert set(mock_session.cache.responses.keys()) == {keys[0], keys[2]}, (
+        'Из кеша должна удаляться страница, которая дольше всего '
+        'не запрашивалась'
+    )
+
+
+def test_cache_index_measures_stored_size(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(cache_backend='sqlite'))
+    with requests_mock.Mocker() as mock:
+        for url in PAGES:
+            mock.get(url, text='Python ' * 10000)
+            utils.get_response(session, url)
+    evicted = session.cache_index.evict(session.cache, 10000)
+    assert evicted == 0, (
+        'Размер кеша должен считаться по сжатым записям хранилища, '
+        'а не по телам ответов'
+    )
+    session.cache_index.close()
+
+
+def test_clear_cache_clears_index(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(cache_backend='sqlite'))
+    with requests_mock.Mocker() as mock:
+        mock.get(PAGES[0], text='Python')
+        utils.get_response(session, PAGES[0])
+    session.cache_index.close()
+    session = configs.configure_session(
+        Namespace(cache_backend='sqlite', clear_cache=True)
+    )
+    assert session.cache_index.connection.execute(
+        'SELECT COUNT(*) FROM cache_index'
+    ).fetchone() == (0,), '--clear-cache должен очищать и индекс кеша'
+    session.cache_index.close()
+
+
+def test_extraction_cache_skips_parsing(tmp_path):
+    path = tmp_path / 'extraction_cache.sqlite'
+    calls = []
+
+    def extract(content):
+        calls.append(content)
+        return content.decode('utf-8'), len(content)
+
+    extraction_cache = cache.ExtractionCache(path, version=1)
+    assert extraction_cache.extract(PAGES[0], b'Final', extract) == (
+        'Final', 5
+    )
+    extraction_cache.close()
+    extraction_cache = cache.ExtractionCache(path, version=1)
+    assert extraction_cache.extract(PAGES[0], b'Final', extract) == (
+        'Final', 5
+    ), 'Данные неизменившейся страницы должны браться из кеша разбора'
+    assert len(calls) == 1, 'Неизменившаяся страница не должна разбираться'
+    extraction_cache.extract(PAGES[0], b'Active', extract)
+    assert len(calls) == 2, 'Изменившаяся страница должна разбираться заново'
+    extraction_cache.close()
+    extraction_cache = cache.ExtractionCache(path, version=2)
+    extraction_cache.extract(PAGES[0], b'Active', extract)
+    assert len(calls) == 3, (
+        'Записи прежней версии извлечения должны удаляться'
+    )
+    extraction_cache.close()
+
+
+def test_extraction_cache_flushes_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'EXTRACTION_BATCH_SIZE', 2)
+    path = tmp_path / 'extraction_cache.sqlite'
+    extraction_cache = cache.ExtractionCache(path, version=1)
+    for url in PAGES:
+        extraction_cache.extract(url, b'Final', bytes.decode)
+    stored = sqlite3.connect(str(path)).execute(
+        'SELECT COUNT(*) FROM extractions'
+    ).fetchone()
+    assert stored == (2,), (
+        'Извлечённые данные должны записываться пакетами, не дожидаясь '
+        'закрытия кеша'
+    )
+    extraction_cache.close()
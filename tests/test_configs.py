@@ -1,9 +1,13 @@
 import argparse
+import json
+from argparse import Namespace
 
 import pytest
+import requests_mock
+from conftest import MAIN_DOC_URL
 
 try:
-    from src import configs
+    from src import configs, utils
 except ModuleNotFoundError:
     assert False, 'Убедитесь что в директории `src` есть файл `configs.py`'
 except ImportError:
@@ -31,7 +35,7 @@ def test_configs_file():
     ),
     (
         argparse._StoreAction, ['-o', '--output'], 'output',
-        ('pretty', 'file'),
+        ('pretty', 'file', 'jsonl', 'sqlite'),
         'Дополнительные способы вывода данных'
     ),
 ])
@@ -66,3 +70,35 @@ def test_configure_argument_parser(
     assert got_action.help == help_str, (
         f'Укажите help-строку cli аргумента {got_action.dest}'
     )
+
+
+def test_configure_session_revalidation(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    expire_config = tmp_path / 'expire.json'
+    expire_config.write_text(json.dumps({'docs.python.org/3/whatsnew/': 0}))
+    session = configs.configure_session(
+        Namespace(clear_cache=False, expire_config=str(expire_config))
+    )
+
+    def etag_callback(request, context):
+        context.headers['ETag'] = '"v1"'
+        if request.headers.get('If-None-Match') == '"v1"':
+            context.status_code = 304
+            return ''
+        return 'What’s New'
+
+    with requests_mock.Mocker() as mock:
+        mock.get(MAIN_DOC_URL + 'whatsnew/', text=etag_callback)
+        mock.get(MAIN_DOC_URL, text='Documentation')
+        for url in (
+            MAIN_DOC_URL + 'whatsnew/', MAIN_DOC_URL + 'whatsnew/',
+            MAIN_DOC_URL, MAIN_DOC_URL
+        ):
+            utils.get_response(session, url)
+        assert mock.call_count == 3
+    assert session.cache_stats == {
+        'refetched': 2, 'revalidated': 1, 'fresh': 1
+    }, (
+        'Устаревшая страница с ETag должна перепроверяться запросом '
+        'If-None-Match, а свежая — браться из кеша'
+    )
@@ -0,0 +1,194 @@
+import hashlib
+import time
+
+import pytest
+import requests_mock
+
+try:
+    from src import downloads
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `downloads.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `downloads.py`'
+
+ARCHIVE_URL = 'https://docs.python.org/3/archives/python-docs-pdf-a4.zip'
+ARCHIVE = bytes(range(256)) * 1000
+ARCHIVE_ETAG = '"v1"'
+
+
+def range_callback(request, context):
+    context.headers['ETag'] = ARCHIVE_ETAG
+    start = int(request.headers.get('Range', 'bytes=0-')[6:-1])
+    if request.headers.get('If-Range', ARCHIVE_ETAG) != ARCHIVE_ETAG:
+        start = 0
+    if start:
+        context.status_code = 206
+        context.headers['Content-Range'] = (
+            f'bytes {start}-{len(ARCHIVE) - 1}/{len(ARCHIVE)}'
+        )
+    context.headers['Content-Length'] = str(len(ARCHIVE) - start)
+    return ARCHIVE[start:]
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    return tmp_path / 'python-docs-pdf-a4.zip'
+
+
+def test_download_file(mock_session, archive_path):
+    with requests_mock.Mocker() as mock:
+        mock.get(ARCHIVE_URL, content=range_callback)
+        got = downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+    assert archive_path.read_bytes() == ARCHIVE
+    assert got['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+    assert not list(archive_path.parent.glob('*.part')), (
+        'Временный файл должен переименовываться в архив'
+    )
+    assert not mock_session.cache.responses, (
+        'Архив не должен сохраняться в кеш запросов'
+    )
+
+
+def test_download_keeps_session_cache(mock_session, archive_path):
+    page_url = 'https://docs.python.org/3/download.html'
+    from_cache = []
+
+    def archive_callback(request, context):
+        from_cache.append(mock_session.get(page_url).from_cache)
+        return range_callback(request, context)
+
+    with requests_mock.Mocker() as mock:
+        mock.get(page_url, text='Download Python documentation')
+        mock.get(ARCHIVE_URL, content=archive_callback)
+        mock_session.get(page_url)
+        downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+    assert from_cache == [True], (
+        'Во время загрузки архива страницы должны браться из кеша сессии'
+    )
+    assert not mock_session.cache.contains(url=ARCHIVE_URL)
+
+
+def test_download_file_resume(mock_session, archive_path):
+    part_path = archive_path.with_name(archive_path.name + '.part')
+    part_path.write_bytes(ARCHIVE[:1000])
+    validator_path = part_path.with_name(part_path.name + '.validator')
+    validator_path.write_text(ARCHIVE_ETAG)
+    with requests_mock.Mocker() as mock:
+        mock.get(ARCHIVE_URL, content=range_callback)
+        got = downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+        assert mock.last_request.headers['Range'] == 'bytes=1000-'
+        assert mock.last_request.headers['If-Range'] == ARCHIVE_ETAG
+    assert archive_path.read_bytes() == ARCHIVE
+    assert got['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+    assert not validator_path.exists()
+
+
+@pytest.mark.parametrize('validator', [None, '"v0"'])
+def test_download_file_resume_changed(mock_session, archive_path, validator):
+    part_path = archive_path.with_name(archive_path.name + '.part')
+    part_path.write_bytes(b'old archive' * 100)
+    if validator is not None:
+        part_path.with_name(part_path.name + '.validator').write_text(
+            validator
+        )
+    with requests_mock.Mocker() as mock:
+        mock.get(ARCHIVE_URL, content=range_callback)
+        got = downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+    assert archive_path.read_bytes() == ARCHIVE, (
+        'Без совпадающего валидатора архив должен загружаться заново, '
+        'а не дописываться к старому .part'
+    )
+    assert got['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+
+
+def test_download_file_ignored_range(mock_session, archive_path):
+    part_path = archive_path.with_name(archive_path.name + '.part')
+    part_path.write_bytes(b'stale')
+    with requests_mock.Mocker() as mock:
+        mock.get(ARCHIVE_URL, content=ARCHIVE)
+        got = downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+    assert archive_path.read_bytes() == ARCHIVE
+    assert got['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+
+
+def test_download_file_incomplete(mock_session, archive_path):
+    with requests_mock.Mocker() as mock:
+        mock.get(
+            ARCHIVE_URL,
+            content=ARCHIVE[:1000],
+            headers={'Content-Length': str(len(ARCHIVE))}
+        )
+        with pytest.raises(downloads.ParserDownloadException):
+            downloads.download_file(mock_session, ARCHIVE_URL, archive_path)
+    assert not archive_path.exists(), (
+        'Недокачанный архив не должен появляться в папке downloads'
+    )
+
+
+def test_download_archive_not_modified(mock_session, archive_path):
+    def etag_callback(request, context):
+        context.headers['ETag'] = '"v1"'
+        if request.headers.get('If-None-Match') == '"v1"':
+            context.status_code = 304
+            return b''
+        return ARCHIVE
+
+    with requests_mock.Mocker() as mock:
+        mock.get(ARCHIVE_URL, content=etag_callback)
+        record, downloaded = downloads.download_archive(
+            mock_session, ARCHIVE_URL, archive_path
+        )
+        assert downloaded
+        assert record['etag'] == '"v1"'
+        assert record['size'] == len(ARCHIVE)
+        record, downloaded = downloads.download_archive(
+            mock_session, ARCHIVE_URL, archive_path
+        )
+        assert mock.last_request.headers['If-None-Match'] == '"v1"'
+    assert not downloaded, (
+        'Неизменившийся архив не должен загружаться повторно'
+    )
+    assert record['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+    assert archive_path.read_bytes() == ARCHIVE
+
+
+def segment_callback(request, context):
+    context.headers['Accept-Ranges'] = 'bytes'
+    if request.method == 'HEAD':
+        context.headers['Content-Length'] = str(len(ARCHIVE))
+        return b''
+    start, end = map(int, request.headers['Range'][6:].split('-'))
+    context.status_code = 206
+    context.headers['Content-Range'] = f'bytes {start}-{end}/{len(ARCHIVE)}'
+    return ARCHIVE[start:end + 1]
+
+
+def test_download_archive_segmented(monkeypatch, mock_session, archive_path):
+    monkeypatch.setattr(downloads, 'SEGMENT_MIN_SIZE', 1024)
+    with requests_mock.Mocker() as mock:
+        mock.head(ARCHIVE_URL, content=segment_callback)
+        mock.get(ARCHIVE_URL, content=segment_callback)
+        record, downloaded = downloads.download_archive(
+            mock_session, ARCHIVE_URL, archive_path, segments=4
+        )
+        ranges = sorted(
+            request.headers['Range'] for request in mock.request_history
+            if request.method == 'GET'
+        )
+    assert ranges == [
+        'bytes=0-63999', 'bytes=128000-191999', 'bytes=192000-255999',
+        'bytes=64000-127999'
+    ], 'Большой архив должен загружаться четырьмя диапазонами'
+    assert archive_path.read_bytes() == ARCHIVE
+    assert record['sha256'] == hashlib.sha256(ARCHIVE).hexdigest()
+
+
+def test_transfer_monitor_rate_limit():
+    with downloads.TransferMonitor(rate_limit=100_000) as monitor:
+        start = time.monotonic()
+        for _ in range(10):
+            monitor.transferred(5_000)
+        elapsed = time.monotonic() - start
+    assert elapsed >= 0.4, (
+        'TransferMonitor должен ограничивать суммарную скорость загрузки'
+    )
@@ -0,0 +1,150 @@
+import time
+from argparse import Namespace
+
+import pytest
+from requests_cache import CachedSession
+
+try:
+    from src import engines, main
+    from src.extractors import extract_pep_status
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `engines.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `engines.py`'
+
+
+def cli_args(engine, workers=4, timeout=5):
+    return Namespace(
+        engine=engine, workers=workers, timeout=timeout, processes=2
+    )
+
+
+@pytest.mark.parametrize('engine', ['async', 'process'])
+@pytest.mark.parametrize('mode', [main.whats_new, main.pep])
+def test_engine_matches_sync(local_site, mode, engine):
+    sessions = [CachedSession(backend='memory') for _ in range(2)]
+    try:
+        sync_results = mode(sessions[0], cli_args('sync'))
+        got = mode(sessions[1], cli_args(engine))
+    finally:
+        for session in sessions:
+            engines.close_process_pool(session)
+    assert len(sync_results) > 1
+    assert got == sync_results, (
+        f'Движок `{engine}` должен возвращать ту же таблицу, что и `sync`'
+    )
+
+
+def test_process_engine_pool(local_site):
+    session = CachedSession(backend='memory')
+    urls = [local_site.base_url + '/peps/pep-0008/']
+    pools = []
+    for _ in range(2):
+        assert engines.crawl(
+            session, urls, extract_pep_status, cli_args('process')
+        ) == ['Active']
+        pools.append(session.process_pool)
+    assert pools[0] is pools[1], (
+        'Пул процессов должен создаваться один раз за запуск'
+    )
+    assert pools[0]._mp_context.get_start_method() == 'spawn', (
+        'Процессы разбора должны запускаться через spawn'
+    )
+    engines.close_process_pool(session)
+    assert session.process_pool is None
+
+
+def test_async_engine_timeout(local_site):
+    slow_url = local_site.base_url + '/peps/pep-0001/'
+    fast_url = local_site.base_url + '/peps/pep-0008/'
+    local_site.delays['/peps/pep-0001/'] = 1
+    got = engines.crawl(
+        CachedSession(backend='memory'),
+        [slow_url, fast_url],
+        extract_pep_status,
+        cli_args('async', timeout=0.2)
+    )
+    assert isinstance(got[0], ConnectionError), (
+        'Движок `async` должен возвращать ConnectionError '
+        'при превышении времени ожидания'
+    )
+    assert got[1] == 'Active'
+
+
+def test_async_engine_timeout_per_request(local_site, tmp_path):
+    from src.journal import Journal, read_journal
+    urls = [
+        local_site.base_url + '/peps/pep-0001/',
+        local_site.base_url + '/peps/pep-0008/',
+    ]
+    local_site.delays['/peps/pep-0001/'] = 0.3
+    local_site.delays['/peps/pep-0008/'] = 0.3
+    got = engines.crawl(
+        CachedSession(backend='memory'), urls, extract_pep_status,
+        cli_args('async', workers=1, timeout=0.5)
+    )
+    assert got == ['Active', 'Active'], (
+        'Время ожидания в очереди пула не должно входить в таймаут запроса'
+    )
+    local_site.delays['/peps/pep-0001/'] = 0.5
+    local_site.delays['/peps/pep-0008/'] = 0
+    journal = Journal(tmp_path / 'pep.jsonl')
+    got = engines.crawl(
+        CachedSession(backend='memory'), urls, extract_pep_status,
+        cli_args('async', workers=2, timeout=0.2), journal
+    )
+    journal.close()
+    assert isinstance(got[0], ConnectionError)
+    assert list(read_journal(tmp_path / 'pep.jsonl')) == [urls[1]], (
+        'Страница, пришедшая после таймаута, не должна попадать в журнал'
+    )
+
+
+def test_iter_crawl_streams(local_site):
+    urls = [
+        local_site.base_url + '/peps/pep-0001/',
+        local_site.base_url + '/peps/pep-0008/',
+    ]
+    local_site.delays['/peps/pep-0008/'] = 1
+    records = engines.iter_crawl(
+        CachedSession(backend='memory'),
+        urls,
+        extract_pep_status,
+        cli_args('sync', workers=2)
+    )
+    start = time.monotonic()
+    assert next(records) == 'Active'
+    assert time.monotonic() - start < 0.5, (
+        'Данные страницы должны выдаваться, не дожидаясь остальных страниц'
+    )
+    assert list(records) == ['Active']
+
+
+@pytest.mark.parametrize('engine', ['sync', 'async', 'process'])
+def test_engine_default_timeout(monkeypatch, tmp_path, local_site, engine):
+    import requests
+    from src import configs
+    monkeypatch.chdir(tmp_path)
+    args = configs.configure_argument_parser(main.MODE_TO_FUNCTION.keys())
+    args = args.parse_args(['pep', '--engine', engine, '--processes', '2'])
+    session = configs.configure_session(
+        Namespace(cache_backend='memory', connect_timeout=3, read_timeout=7)
+    )
+    timeouts = []
+    send = requests.adapters.HTTPAdapter.send
+
+    def recording_send(adapter, request, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        return send(adapter, request, timeout=timeout, **kwargs)
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', recording_send)
+    assert engines.crawl(
+        session, [local_site.base_url + '/peps/pep-0008/'],
+        extract_pep_status, args
+    ) == ['Active']
+    assert timeouts == [(3, 7)], (
+        'Без --timeout должны действовать таймауты подключения и чтения '
+        'транспорта'
+    )
+    engines.close_process_pool(session)
+    session.cache_index.close()
@@ -0,0 +1,87 @@
+import sqlite3
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+try:
+    from src import history, main
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `history.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `history.py`'
+
+
+def record_run(store, mode, records):
+    store.begin()
+    for key, record in records.items():
+        store.add(key, record)
+    return store.commit(mode)
+
+
+def test_run_store_diff(tmp_path):
+    store = history.RunStore(tmp_path / 'history.sqlite')
+    first = {'pep-1': 'Draft', 'pep-2': 'Active', 'pep-3': 'Final'}
+    second = {'pep-1': 'Accepted', 'pep-2': 'Active', 'pep-4': 'Draft'}
+    runs = [record_run(store, 'pep', first) for _ in range(3)]
+    assert [changed for _, changed, _ in runs] == [3, 0, 0], (
+        'Неизменившиеся записи не должны сохраняться повторно'
+    )
+    run, changed, removed = record_run(store, 'pep', second)
+    assert (changed, removed) == (2, 1)
+    record_run(store, 'whats-new', {'3.13.html': ('Title', 'Editor')})
+    assert store.diff('pep', runs[0][0], run) == [
+        ('pep-1', 'Draft', 'Accepted'),
+        ('pep-3', 'Final', None),
+        ('pep-4', None, 'Draft'),
+    ]
+    assert store.diff('pep', runs[0][0], runs[2][0]) == []
+    assert store.resolve('pep') == run
+    assert store.resolve('pep', offset=1) == runs[2][0]
+    assert store.resolve('pep', '2100-01-01') == run
+    with pytest.raises(LookupError):
+        store.resolve('pep', '2000-01-01T00:00')
+    store.close()
+
+
+def test_run_store_key_history(tmp_path):
+    store = history.RunStore(tmp_path / 'history.sqlite')
+    for status in ('Draft', 'Draft', 'Accepted', 'Draft'):
+        record_run(store, 'pep', {'pep-1': status})
+    assert store.key_history('pep', 'pep-1') == [
+        ('Draft', 1, 2), ('Accepted', 3, 3), ('Draft', 4, 4)
+    ]
+    assert [count for _, _, count in store.runs('pep')] == [1, 1, 1, 1]
+    connection = sqlite3.connect(tmp_path / 'history.sqlite')
+    assert connection.execute('SELECT COUNT(*) FROM items').fetchone() == (
+        3,
+    )
+    connection.close()
+    store.close()
+
+
+def test_pep_history(monkeypatch, tmp_path, site_session):
+    from tests.fixture_data import pages
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    site_session.profiler = None
+    args = Namespace(
+        mode='pep', output=None, profile=False, profile_dump=None,
+        history=True
+    )
+    main.run_mode(site_session, args)
+    peps = [
+        (number, pep_type, 'A', 'Active') if number == 638
+        else (number, pep_type, status, page_status)
+        for number, pep_type, status, page_status in pages.PEPS
+    ]
+    site_session.site_mock.get(main.PEPS_URL, text=pages.pep_zero_page(peps))
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-0638/', text=pages.pep_pages(peps)['pep-0638/']
+    )
+    site_session.cache.clear()
+    main.run_mode(site_session, args)
+    store = history.RunStore(tmp_path / 'history.sqlite')
+    assert store.diff('pep', 1, 2) == [
+        (main.PEPS_URL + 'pep-0638/', 'Draft', 'Active')
+    ], 'История должна хранить статус каждого PEP'
+    store.close()
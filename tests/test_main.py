@@ -1,3 +1,4 @@
+from argparse import Namespace
 from pathlib import Path
 
 import pytest
@@ -114,6 +115,45 @@ def test_download(monkeypatch, tmp_path, mock_session):
     )
 
 
+@pytest.mark.parametrize('formats, expected', [
+    (['pdf-a4.zip'], 1),
+    (['html.tar.bz2', 'epub'], 2),
+    (['all'], 9),
+])
+def test_download_formats(
+    monkeypatch, tmp_path, site_session, formats, expected
+):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    main.download(site_session, Namespace(formats=formats, workers=4))
+    archives = [
+        path for path in (tmp_path / 'downloads').iterdir()
+        if path.name.startswith('python-')
+    ]
+    assert len(archives) == expected, (
+        'Функция `download` должна загружать архивы выбранных форматов'
+    )
+    for path in archives:
+        assert path.read_bytes() == path.name.encode('utf-8') * 100
+
+
+def test_download_archive_error(monkeypatch, tmp_path, site_session):
+    import requests
+    from metrics import RunMetrics
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    site_session.run_metrics = RunMetrics()
+    site_session.site_mock.get(
+        main.MAIN_DOC_URL + 'archives/python-3.13-docs-pdf-a4.zip',
+        exc=requests.exceptions.ConnectTimeout
+    )
+    main.download(
+        site_session, Namespace(formats=['pdf-a4.zip', 'epub'], workers=2)
+    )
+    assert (tmp_path / 'downloads' / 'python-3.13-docs.epub').exists(), (
+        'Ошибка загрузки одного архива не должна прерывать загрузку остальных'
+    )
+    assert site_session.run_metrics.item_errors == 1
+
+
 def test_mode_to_function():
     got = main.MODE_TO_FUNCTION
     assert isinstance(got, dict), (
@@ -142,3 +182,265 @@ def test_mode_to_function():
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет значения {func}'
         )
+
+
+PEP_TABLE = [
+    ('Статус', 'Количество'),
+    ('Active', 3),
+    ('Final', 3),
+    ('Rejected', 1),
+    ('April Fool!', 1),
+    ('Superseded', 1),
+    ('Draft', 1),
+    ('Accepted', 1),
+    ('Withdrawn', 1),
+    ('Итого', 12),
+]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_pep(site_session, workers):
+    got = main.pep(site_session, Namespace(workers=workers))
+    assert got == PEP_TABLE, (
+        'Функция `pep` должна возвращать одинаковую таблицу '
+        'при любом количестве потоков'
+    )
+
+
+def test_pep_json_source(site_session):
+    got = main.pep(site_session, Namespace(pep_source='json'))
+    assert got == PEP_TABLE, (
+        'Статусы из JSON-документа должны давать ту же таблицу, '
+        'что и статусы со страниц PEP'
+    )
+    assert site_session.site_mock.call_count == 2, (
+        'С источником json должны загружаться только PEP 0 и JSON-документ'
+    )
+
+
+def test_pep_json_source_fallback(site_session):
+    site_session.site_mock.get(
+        main.PEPS_URL + 'api/peps.json', status_code=404, text='Not Found'
+    )
+    got = main.pep(site_session, Namespace(pep_source='json'))
+    assert got == PEP_TABLE, (
+        'Без JSON-документа статусы должны браться со страниц PEP'
+    )
+
+
+def test_pep_incremental(monkeypatch, tmp_path, site_session):
+    from tests.fixture_data import pages
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    cli_args = Namespace(incremental=True)
+    assert main.pep(site_session, cli_args) == PEP_TABLE
+    peps = [
+        (number, pep_type, 'A', 'Active') if number == 638
+        else (number, pep_type, status, page_status)
+        for number, pep_type, status, page_status in pages.PEPS
+    ]
+    site_session.site_mock.get(main.PEPS_URL, text=pages.pep_zero_page(peps))
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-0638/', text=pages.pep_pages(peps)['pep-0638/']
+    )
+    site_session.site_mock.reset_mock()
+    site_session.cache.clear()
+    got = main.pep(site_session, cli_args)
+    assert site_session.site_mock.call_count == 2, (
+        'Повторный запуск должен загружать только PEP 0 '
+        'и страницы изменившихся PEP'
+    )
+    assert got == [
+        PEP_TABLE[0], ('Active', 4), *PEP_TABLE[2:6], *PEP_TABLE[7:]
+    ], 'Статусы неизменившихся PEP должны браться из снимка'
+
+
+def test_pep_final_status_change(monkeypatch, tmp_path, site_session):
+    from tests.fixture_data import pages
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    assert main.pep(site_session) == PEP_TABLE
+    peps = [
+        (number, pep_type, 'S', 'Superseded') if number == 100
+        else (number, pep_type, status, page_status)
+        for number, pep_type, status, page_status in pages.PEPS
+    ]
+    site_session.site_mock.get(main.PEPS_URL, text=pages.pep_zero_page(peps))
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-0100/', text=pages.pep_pages(peps)['pep-0100/']
+    )
+    site_session.get(main.PEPS_URL, force_refresh=True)
+    got = dict(main.pep(site_session)[1:])
+    assert (got['Final'], got['Superseded']) == (2, 2), (
+        'Статус Final из кеша не должен скрывать смену статуса PEP'
+    )
+
+
+def test_pep_resume_rechecks_final(monkeypatch, tmp_path, site_session):
+    import json
+    from tests.fixture_data import pages
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    assert main.pep(site_session) == PEP_TABLE
+    peps = [
+        (number, pep_type, 'S', 'Superseded') if number == 100
+        else (number, pep_type, status, page_status)
+        for number, pep_type, status, page_status in pages.PEPS
+    ]
+    site_session.site_mock.get(main.PEPS_URL, text=pages.pep_zero_page(peps))
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-0100/', text=pages.pep_pages(peps)['pep-0100/']
+    )
+    site_session.get(main.PEPS_URL, force_refresh=True)
+    journal_path = tmp_path / 'journals' / 'pep.jsonl'
+    journal_path.write_text(json.dumps(
+        {'url': main.PEPS_URL + 'pep-0100/', 'record': 'Final'}
+    ) + '\n', encoding='utf-8')
+    got = dict(main.pep(site_session, Namespace(resume=True))[1:])
+    assert (got['Final'], got['Superseded']) == (2, 2), (
+        'Продолженный обход должен перепроверять статус Final из журнала'
+    )
+
+
+def test_pep_resume(monkeypatch, tmp_path, site_session):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    extract_pep_status = main.extract_pep_status
+    parsed = []
+
+    def interrupted_extract(content):
+        if len(parsed) == 5:
+            raise KeyboardInterrupt
+        parsed.append(content)
+        return extract_pep_status(content)
+
+    monkeypatch.setattr(main, 'extract_pep_status', interrupted_extract)
+    with pytest.raises(KeyboardInterrupt):
+        main.pep(site_session)
+    journal_path = tmp_path / 'journals' / 'pep.jsonl'
+    assert len(journal_path.read_text(encoding='utf-8').splitlines()) == 5, (
+        'Журнал должен сохранять статусы, полученные до прерывания'
+    )
+    monkeypatch.setattr(main, 'extract_pep_status', extract_pep_status)
+    site_session.site_mock.reset_mock()
+    site_session.cache.clear()
+    got = main.pep(site_session, Namespace(resume=True))
+    assert got == PEP_TABLE
+    assert site_session.site_mock.call_count == 1 + 12 - 5, (
+        'Продолженный обход не должен загружать страницы из журнала'
+    )
+    assert not journal_path.exists(), (
+        'После успешного обхода журнал должен удаляться'
+    )
+
+
+def test_pep_journal_kept_without_resume(
+    monkeypatch, tmp_path, caplog, site_session
+):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    journal_path = tmp_path / 'journals' / 'pep.jsonl'
+    journal_path.parent.mkdir()
+    journal_path.write_text(
+        '{"url": "https://peps.python.org/pep-0001/", "record": "Active"}\n',
+        encoding='utf-8'
+    )
+
+    def interrupted_extract(content):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(main, 'extract_pep_status', interrupted_extract)
+    with pytest.raises(KeyboardInterrupt):
+        main.pep(site_session)
+    assert len(journal_path.read_text(encoding='utf-8').splitlines()) == 1, (
+        'Запуск без --resume не должен стирать журнал прерванного обхода'
+    )
+    assert '--resume' in caplog.text
+
+
+def test_pep_fault_isolation(monkeypatch, caplog, site_session):
+    import engines
+    import requests
+    from tests.fixture_data import pages
+    monkeypatch.setattr(engines, 'RETRY_BACKOFF', 0)
+    caplog.set_level('INFO')
+    peps = [*pages.PEPS, (9999, 'S', 'X', 'Draft')]
+    site_session.site_mock.get(main.PEPS_URL, text=pages.pep_zero_page(peps))
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-9999/', text=pages.pep_pages(peps)['pep-9999/']
+    )
+    site_session.site_mock.get(
+        main.PEPS_URL + 'pep-0100/', text='<html><dl></dl></html>'
+    )
+    site_session.site_mock.get(main.PEPS_URL + 'pep-0008/', [
+        {'exc': requests.exceptions.ConnectTimeout},
+        {'text': pages.pep_pages()['pep-0008/']},
+    ])
+    got = main.pep(site_session, Namespace(retries=2))
+    assert got == [
+        PEP_TABLE[0], PEP_TABLE[1], ('Final', 2), *PEP_TABLE[3:-1],
+        ('Итого', 11)
+    ], (
+        'Страницы с ошибкой разбора и PEP с неизвестным статусом '
+        'не должны прерывать обход, а ошибки загрузки — повторяться'
+    )
+    assert len([
+        request for request in site_session.site_mock.request_history
+        if request.url.endswith('pep-0008/')
+    ]) == 2, 'Страница с ошибкой загрузки должна загружаться повторно'
+    assert engines.RETRY_MESSAGE.format(1, 1, 0) in caplog.messages, (
+        'Страница с ошибкой разбора не должна загружаться повторно'
+    )
+    assert engines.RETRY_MESSAGE.format(2, 1, 0) not in caplog.messages
+
+
+def test_run_modes(monkeypatch, tmp_path, site_session):
+    import history
+    import outputs
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    site_session.profiler = None
+    args = Namespace(
+        mode='whats-new,pep,latest-versions,download', output='jsonl',
+        profile=False, profile_dump=None, history=True
+    )
+    items = main.run_modes(
+        site_session, args, ['whats-new', 'pep', 'latest-versions', 'download']
+    )
+    saved = {
+        path.name.split('_')[0]: path.read_text(encoding='utf-8')
+        for path in (tmp_path / 'results').iterdir()
+    }
+    assert sorted(saved) == ['pep', 'whats-new'], (
+        'Ошибка одного режима не должна прерывать остальные'
+    )
+    assert items == {
+        'whats-new': len(saved['whats-new'].splitlines()),
+        'pep': PEP_TABLE[-1][1],
+    }, 'Число элементов должно считаться по каждому режиму'
+    assert len(saved['pep'].splitlines()) == len(PEP_TABLE) - 1
+    assert list((tmp_path / 'downloads').glob('*.zip')), (
+        'Режим download должен выполняться вместе с остальными'
+    )
+    assert main.PEPS_URL + 'pep-0008/' in set(site_session.cache.urls()), (
+        'Загрузка архивов не должна отключать кеш страниц других режимов'
+    )
+    store = history.RunStore(tmp_path / 'history.sqlite')
+    assert [len(store.runs(mode)) for mode in ('whats-new', 'pep')] == [
+        1, 1
+    ], 'История каждого режима должна сохраняться отдельно'
+    assert store.runs('latest-versions') == []
+    store.close()
+
+
+def test_pep_statuses_stream(local_site):
+    import time
+    from requests_cache import CachedSession
+    local_site.delays['/peps/pep-0008/'] = 1
+    peps = [
+        (main.PEPS_URL + 'pep-0001/', 'A'), (main.PEPS_URL + 'pep-0008/', 'A')
+    ]
+    statuses = main.get_page_statuses(
+        CachedSession(backend='memory'), peps, Namespace(workers=2)
+    )
+    start = time.monotonic()
+    assert next(statuses) == (main.PEPS_URL + 'pep-0001/', 'Active')
+    assert time.monotonic() - start < 0.5, (
+        'Статусы PEP должны выдаваться по мере загрузки страниц'
+    )
+    assert list(statuses) == [(main.PEPS_URL + 'pep-0008/', 'Active')]
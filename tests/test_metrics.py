@@ -0,0 +1,86 @@
+import json
+from argparse import Namespace
+
+try:
+    from src import configs, main, metrics
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+
+
+def run_pep(metrics_path):
+    args = Namespace(
+        mode='pep', cache_backend='memory', profile=False,
+        profile_dump=None, output=None, metrics=str(metrics_path),
+        cache_max_size=None
+    )
+    session = configs.configure_session(args)
+    main.close_session(session, args, main.run_mode(session, args))
+
+
+def test_json_metrics(monkeypatch, tmp_path, local_site):
+    monkeypatch.chdir(tmp_path)
+    metrics_path = tmp_path / 'metrics.json'
+    run_pep(metrics_path)
+    got = json.loads(metrics_path.read_text(encoding='utf-8'))
+    assert got['mode'] == 'pep'
+    assert got['requests_total'] == 13, (
+        'Должны учитываться запрос PEP 0 и запросы всех страниц PEP'
+    )
+    assert got['latency_seconds']['count'] == 13
+    assert got['downloaded_bytes_total'] > 0
+    assert got['cache_hit_ratio'] == 0
+    assert got['items'] == {'pep': 12}, 'Для pep должно считаться число PEP'
+    assert got['request_errors_total'] == got['item_errors_total'] == 0
+
+
+def test_prometheus_metrics(monkeypatch, tmp_path, local_site):
+    monkeypatch.chdir(tmp_path)
+    metrics_path = tmp_path / 'parser.prom'
+    run_pep(metrics_path)
+    got = metrics_path.read_text(encoding='utf-8')
+    assert 'parser_requests_total{mode="pep"} 13' in got
+    assert 'parser_latency_seconds_bucket{mode="pep",le="+Inf"} 13' in got
+    assert '# TYPE parser_latency_seconds histogram' in got
+    assert '# TYPE parser_items gauge' in got
+    assert 'parser_items{mode="pep"} 12' in got
+
+
+def test_prometheus_items_per_mode(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(cache_backend='memory'))
+    got = metrics.format_prometheus(metrics.collect_metrics(
+        session, 'whats-new,pep', {'whats-new': 5, 'pep': 12}
+    ))
+    assert 'parser_items{mode="whats-new"} 5' in got
+    assert 'parser_items{mode="pep"} 12' in got, (
+        'Число элементов должно выводиться отдельно для каждого режима'
+    )
+    session.cache_index.close()
+
+
+def test_latency_histogram():
+    got = metrics.latency_histogram([0.001, 0.2, 3], buckets=(0.01, 1, 5))
+    assert got['buckets'] == {'0.01': 1, '1': 2, '5': 3}
+    assert got['count'] == 3
+
+
+def test_metrics_written_when_mode_fails(monkeypatch, tmp_path):
+    def fail(session, args):
+        raise ConnectionError('Сайт недоступен')
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(main.MODE_TO_ROWS, 'pep', fail)
+    metrics_path = tmp_path / 'metrics.json'
+    monkeypatch.setattr('sys.argv', [
+        'main.py', 'pep', '--cache-backend', 'memory',
+        '--metrics', str(metrics_path)
+    ])
+    main.main()
+    assert metrics_path.exists(), (
+        'Метрики должны записываться и при ошибке режима'
+    )
+    got = json.loads(metrics_path.read_text(encoding='utf-8'))
+    assert got['mode_errors_total'] == 1
+    assert got['items'] == {}
@@ -1,3 +1,6 @@
+import csv
+import json
+import sqlite3
 from argparse import Namespace
 from datetime import datetime
 from pathlib import Path
@@ -82,6 +85,66 @@ def test_control_output_file(monkeypatch, tmp_path, records, cli_arg):
     )
 
 
+def test_control_output_streams(monkeypatch, tmp_path, capsys, records):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    rows = records('pep')
+    outputs.control_output(iter(rows), cli_args('pep', 'file'))
+    (file_path,) = (tmp_path / 'results').glob('*.csv')
+    with open(file_path, encoding='utf-8') as file:
+        assert [tuple(row) for row in csv.reader(file)] == rows, (
+            'Строки из генератора должны записываться в CSV-файл'
+        )
+    outputs.control_output(iter(rows), cli_args('pep', 'pretty'))
+    assert rows[1][0] in capsys.readouterr().out
+
+
+def test_control_output_jsonl(monkeypatch, tmp_path, records):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    header, *rows = records('whats-new')
+    outputs.control_output(
+        iter([header, *rows]), cli_args('whats-new', 'jsonl')
+    )
+    (file_path,) = (tmp_path / 'results').glob('whats-new_*.jsonl')
+    got = [
+        json.loads(line)
+        for line in file_path.read_text(encoding='utf-8').splitlines()
+    ]
+    assert got == [dict(zip(header, row)) for row in rows], (
+        'Каждая строка результатов должна записываться JSON-объектом '
+        'с ключами из заголовка'
+    )
+
+
+def test_control_output_sqlite(monkeypatch, tmp_path, records):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    header, *rows = records('pep')
+    for _ in range(2):
+        outputs.control_output(
+            iter([header, *rows]), cli_args('pep', 'sqlite')
+        )
+    connection = sqlite3.connect(tmp_path / 'results' / 'results.sqlite')
+    runs = connection.execute(
+        'SELECT started, COUNT(*) FROM results WHERE mode = ? '
+        'GROUP BY started', ('pep',)
+    ).fetchall()
+    assert [count for _, count in runs] == [len(rows), len(rows)], (
+        'Каждый запуск должен сохраняться отдельно по времени запуска'
+    )
+    got = connection.execute(
+        'SELECT record FROM results WHERE mode = ? AND started = ? '
+        'ORDER BY position', ('pep', runs[0][0])
+    ).fetchall()
+    assert [json.loads(record) for record, in got] == [
+        dict(zip(header, row)) for row in rows
+    ]
+    assert 'results_started' in [
+        name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    ]
+    connection.close()
+
+
 def test_output_file():
     assert hasattr(outputs, 'control_output'), (
         'Напишите функцию `control_output` в модуле `output.py`'
@@ -0,0 +1,65 @@
+import pstats
+from argparse import Namespace
+
+import pytest
+
+try:
+    from src import configs, main, profiling
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `profiling.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `profiling.py`'
+
+
+def test_profile_report(monkeypatch, tmp_path, local_site):
+    monkeypatch.chdir(tmp_path)
+    dump_path = str(tmp_path / 'run.pstats')
+    args = Namespace(
+        mode='pep', cache_backend='memory', profile=True,
+        profile_dump=dump_path, output=None, workers=4
+    )
+    session = configs.configure_session(args)
+    main.run_mode(session, args)
+    timings = session.profiler.timings
+    for stage in ('fetch', 'parse', 'extract', 'mode', 'output'):
+        assert stage in timings, f'Должен замеряться этап {stage}'
+    assert len(timings['extract']) == 12, (
+        'Разбор должен замеряться для каждой страницы PEP'
+    )
+    report = session.profiler.report()
+    assert local_site.base_url in report, (
+        'Отчёт должен содержать самые долгие URL'
+    )
+    assert 'extract_pep_status' in {
+        function for _, _, function in pstats.Stats(dump_path).stats
+    }, 'cProfile должен профилировать и потоки пула загрузки'
+    session.cache_index.close()
+
+
+def test_profile_failed_mode(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    dump_path = tmp_path / 'run.pstats'
+    args = Namespace(
+        mode='pep', cache_backend='memory', profile=True,
+        profile_dump=str(dump_path), output=None
+    )
+    session = configs.configure_session(args)
+
+    def failed_mode(session, cli_args=None):
+        raise ConnectionError('PEP 0 недоступна')
+
+    monkeypatch.setitem(main.MODE_TO_FUNCTION, 'pep', failed_mode)
+    monkeypatch.setitem(main.MODE_TO_ROWS, 'pep', failed_mode)
+    with pytest.raises(ConnectionError):
+        main.run_mode(session, args)
+    assert dump_path.exists(), (
+        'Статистика cProfile должна сохраняться и при ошибке режима'
+    )
+    session.cache_index.close()
+
+
+def test_percentile():
+    values = [number / 100 for number in range(1, 101)]
+    assert profiling.percentile(values, 50) == 0.51
+    assert profiling.percentile(values, 95) == 0.96
+    assert profiling.percentile(values, 100) == 1
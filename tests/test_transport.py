@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+try:
+    from src import configs, hedging, ratelimit, transport, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `transport.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `transport.py`'
+
+
+@pytest.fixture
+def flaky_server():
+    """Сервер, который отвечает 503 с Retry-After на первые два запроса."""
+    requests_count = []
+
+    class FlakyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_count.append(self.path)
+            if len(requests_count) <= 2:
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = b'Python'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/'.format(server.server_address[1]), \
+        requests_count
+    server.shutdown()
+    server.server_close()
+
+
+def test_transport_settings(tmp_path):
+    config = tmp_path / 'transport.json'
+    config.write_text(json.dumps({'http_retries': 5, 'read_timeout': 10}))
+    got = transport.load_transport_settings(Namespace(
+        workers=32, transport_config=str(config), read_timeout=7,
+        keep_alive=False
+    ))
+    assert got['pool_size'] == 32, (
+        'Размер пула по умолчанию должен быть не меньше числа потоков'
+    )
+    assert got['http_retries'] == 5, 'Настройки должны читаться из файла'
+    assert got['read_timeout'] == 7, (
+        'Опции командной строки должны иметь приоритет над файлом'
+    )
+    assert got['keep_alive'] is False
+    assert transport.make_limiter(
+        transport.load_transport_settings(Namespace(rate=0))
+    ) is None, '--rate 0 должен отключать ограничение частоты запросов'
+
+
+def test_transport_retries(monkeypatch, tmp_path, flaky_server):
+    url, requests_count = flaky_server
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(
+        cache_backend='memory', backoff_factor=0, pool_size=4
+    ))
+    adapter = session.get_adapter(url)
+    assert adapter._pool_maxsize == 4
+    assert session.rate_limiter is not None, (
+        'Ограничение частоты запросов по умолчанию должно быть включено'
+    )
+    got = utils.get_response(session, url)
+    assert got.status_code == 200 and got.text == 'Python', (
+        'Ответы 503 должны повторяться адаптером транспорта'
+    )
+    assert len(requests_count) == 3
+    session.cache_index.close()
+
+
+def test_rate_limiter_adapts(monkeypatch, tmp_path, flaky_server):
+    url, requests_count = flaky_server
+    monkeypatch.chdir(tmp_path)
+    session = configs.configure_session(Namespace(
+        cache_backend='memory', backoff_factor=0, rate=8
+    ))
+    acquired = []
+    acquire = session.rate_limiter.acquire
+    monkeypatch.setattr(
+        session.rate_limiter, 'acquire',
+        lambda url: acquired.append(url) or acquire(url)
+    )
+    got = utils.get_response(session, url)
+    assert got.text == 'Python' and len(requests_count) == 3
+    assert len(acquired) == 3, 'Каждый повтор запроса должен ждать токена'
+    assert session.rate_limiter.rates() == {url[7:-1]: 3}, (
+        'Каждый ответ 503, в том числе на повтор, должен уменьшать '
+        'частоту запросов вдвое'
+    )
+    utils.get_response(session, url)
+    assert session.rate_limiter.rates() == {url[7:-1]: 3}, (
+        'Ответы из кеша не должны влиять на частоту запросов'
+    )
+    utils.get_response(session, url + 'page')
+    assert session.rate_limiter.rates() == {url[7:-1]: 4}, (
+        'После быстрого ответа частота запросов должна расти'
+    )
+    session.cache_index.close()
+
+
+def test_token_bucket():
+    bucket = ratelimit.TokenBucket(rate=20, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.45, (
+        'Сверх запаса токены должны выдаваться не чаще rate в секунду'
+    )
+
+
+class FakeResponse:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_hedged_request():
+    hedger = hedging.Hedger(max_workers=4)
+    for _ in range(20):
+        hedger.tracker.add(0.01)
+    responses = []
+    delays = iter([1, 0])
+
+    def send():
+        delay = next(delays)
+        time.sleep(delay)
+        responses.append(FakeResponse('slow' if delay else 'fast'))
+        return responses[-1]
+
+    start = time.monotonic()
+    got = hedger.send(send)
+    assert got.name == 'fast', 'Должен использоваться первый пришедший ответ'
+    assert time.monotonic() - start < 0.5
+    assert (hedger.sent, hedger.won) == (1, 1)
+    hedger.executor.shutdown(wait=True)
+    assert responses[-1].name == 'slow' and responses[-1].closed, (
+        'Опоздавший ответ должен закрываться'
+    )
+    assert hedger.saved > 0.5